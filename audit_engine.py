@@ -0,0 +1,205 @@
+import math
+import multiprocessing
+import threading
+import requests
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+from block import Block
+from blockchain import MEDIAN_TIME_BLOCKS, Blockchain
+from crypto_utils import CryptoUtils
+from merkle import merkle_root
+from miner import PROCESS_CONTEXT, block_work
+from wire_format import STREAM_ACCEPT, iter_blocks
+
+def verify_range(blocks: List[Dict], previous: Dict, difficulties: List[int], min_timestamps: List[float]) -> Dict:
+    """Fully check a contiguous run of blocks (runs in a worker process)
+
+    `previous` is the block just below the range, `difficulties` holds
+    the difficulty the retarget schedule requires at each height and
+    `min_timestamps` the median time past each timestamp must exceed. Returns
+    the errors found, the heights of the blocks that failed and the
+    voter_id of every vote in the range, so the caller can detect double
+    votes that span ranges.
+    """
+    errors = []
+    invalid_heights = []
+    voters = []
+    previous_block = Block.from_dict(previous)
+    for block_data, difficulty, min_timestamp in zip(blocks, difficulties, min_timestamps):
+        block = Block.from_dict(block_data)
+        block_errors = []
+        error = Blockchain.validate_block(block, previous_block, difficulty, min_timestamp)
+        if error:
+            block_errors.append(f"{error} at block {block.index}")
+        elif block.merkle_root != merkle_root(block.votes):
+            block_errors.append(f"Invalid Merkle root at block {block.index}")
+        invalid = CryptoUtils.verify_signatures(block.votes).count(False)
+        if invalid:
+            block_errors.append(f"{invalid} invalid signature(s) at block {block.index}")
+        if block_errors:
+            errors.extend(block_errors)
+            invalid_heights.append(block.index)
+        voters.extend(vote.get("voter_id") for vote in block.votes if isinstance(vote, dict))
+        previous_block = block
+    return {"errors": errors, "invalid_heights": invalid_heights, "voters": voters}
+
+class AuditEngine:
+    """Streams each node's chain once and verifies every block across a pool of worker processes
+
+    Blocks are read one at a time from a newline-delimited /chain response,
+    grouped into ranges of `min_range` and checked in parallel (hash and
+    Merkle root, linkage, timestamp, declared difficulty, proof of work, signatures).
+    At most `max_in_flight` ranges per node are held at once, so memory
+    stays bounded by the pool, not the chain; only the recent headers the
+    difficulty and timestamp rules read and the voter set for double-vote
+    detection live in the calling process.
+    """
+
+    def __init__(self, workers: int = 0, min_range: int = 50, max_errors: int = 20, timeout: float = 10,
+                 max_in_flight: int = None):
+        self.workers = max(1, workers or multiprocessing.cpu_count())
+        self.min_range = min_range
+        self.max_errors = max_errors
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.rules = Blockchain()  # Fixed genesis and retarget schedule every node must follow
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def stream_chain(self, node_url: str) -> Iterator[Dict]:
+        """One node's chain, a block at a time"""
+        with requests.get(f"{node_url}/chain", headers={"Accept": STREAM_ACCEPT},
+                          timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            yield from iter_blocks(response)
+
+    def split(self, length: int, first: int = 1) -> List[Tuple[int, int]]:
+        """Ranges [start, end) covering [first, length), a few per worker so the pool stays balanced"""
+        size = max(self.min_range, math.ceil((length - first) / (self.workers * 4)))
+        return [(start, min(start + size, length)) for start in range(first, length, size)]
+
+    def _submit(self, job: Tuple) -> Future:
+        """Queue verify_range on the pool, or run it right away without one"""
+        if self.workers == 1:
+            future = Future()
+            future.set_result(verify_range(*job))
+            return future
+        with self._pool_lock:
+            if self._pool is None:
+                # The auditor runs one thread per node, so workers are not forked from it
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=PROCESS_CONTEXT)
+            return self._pool.submit(verify_range, *job)
+
+    def _map(self, jobs: List[Tuple]) -> List[Dict]:
+        """Run verify_range over the jobs, in process only when there is nothing to parallelize"""
+        if len(jobs) <= 1:
+            return [verify_range(*job) for job in jobs]
+        return [future.result() for future in [self._submit(job) for job in jobs]]
+
+    def verify_blocks(self, blocks: List[Dict], previous: Dict, difficulties: List[int],
+                      min_timestamps: List[float]) -> Dict:
+        """verify_range over a run of blocks of any length, split across the pool when it is long"""
+        ranges = self.split(len(blocks), 0)
+        jobs = [(blocks[start:end], blocks[start - 1] if start else previous, difficulties[start:end],
+                 min_timestamps[start:end])
+                for start, end in ranges]
+        merged = {"errors": [], "invalid_heights": [], "voters": []}
+        for result in self._map(jobs):
+            for key in merged:
+                merged[key].extend(result[key])
+        return merged
+
+    def audit_chain(self, node_url: str, blocks: Iterable[Dict]) -> Dict:
+        """Verify a chain read one block at a time with one pass over every block"""
+        # Timestamp and difficulty of the blocks the retarget and median time past rules read
+        keep = max(self.rules.retarget_interval + 1, MEDIAN_TIME_BLOCKS)
+        window: Dict[int, Tuple[float, int]] = {}
+
+        def header_at(height: int) -> Tuple[float, int]:
+            return window[height]
+
+        errors = []
+        seen = set()
+        double_voters = set()
+        in_flight = deque()
+
+        def collect(future: Future):
+            result = future.result()
+            errors.extend(result["errors"])
+            for voter_id in result["voters"]:
+                if voter_id in seen:
+                    double_voters.add(voter_id)
+                seen.add(voter_id)
+
+        def flush(batch: List[Dict], previous: Dict, difficulties: List[int], min_timestamps: List[float]):
+            in_flight.append(self._submit((batch, previous, difficulties, min_timestamps)))
+            while len(in_flight) > self.max_in_flight:
+                collect(in_flight.popleft())
+
+        length = work = 0
+        previous = tip = None
+        batch, difficulties, min_timestamps = [], [], []
+        for block in blocks:
+            if length == 0:
+                if block['hash'] != self.rules.view.blocks[0].hash:
+                    errors.append("Unknown genesis block")
+                    break
+                previous = block
+            else:
+                difficulties.append(self.rules.difficulty_for(length, header_at))
+                min_timestamps.append(self.rules.median_time_past(length, header_at))
+                batch.append(block)
+                if len(batch) >= self.min_range:
+                    flush(batch, previous, difficulties, min_timestamps)
+                    previous, batch, difficulties, min_timestamps = batch[-1], [], [], []
+            window[length] = (block['timestamp'], block['difficulty'])
+            window.pop(length - keep, None)
+            work += block_work(block['difficulty'])
+            tip = block['hash']
+            length += 1
+        if batch:
+            flush(batch, previous, difficulties, min_timestamps)
+        while in_flight:
+            collect(in_flight.popleft())
+
+        if not length:
+            errors.append("Empty chain")
+        if double_voters:
+            errors.append(f"{len(double_voters)} voter(s) with more than one vote")
+        report = {
+            "node": node_url,
+            "valid": not errors,
+            "blocks": length,
+            "tip": {"hash": tip, "length": length, "work": work},
+            "errors": errors[:self.max_errors],
+            "double_voters": sorted(double_voters),
+            "unique_voters": len(seen)
+        }
+        if errors:
+            report["error"] = errors[0]
+        return report
+
+    def audit(self, node_urls: Iterable[str]) -> Dict[str, Dict]:
+        """Stream and verify every node's chain concurrently
+
+        Ranges from all nodes share the pool, so the report takes as long
+        as the total work divided by the cores, not nodes times checks.
+        """
+        node_urls = list(node_urls)
+
+        def audit_node(node_url: str) -> Dict:
+            try:
+                return self.audit_chain(node_url, self.stream_chain(node_url))
+            except Exception as e:
+                return {"valid": False, "error": str(e), "node": node_url}
+
+        with ThreadPoolExecutor(max_workers=max(1, len(node_urls))) as executor:
+            return dict(zip(node_urls, executor.map(audit_node, node_urls)))
+
+    def close(self):
+        """Shut down the worker pool"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
@@ -1,106 +1,131 @@
-import requests
 import time
-from typing import List, Dict
+from typing import Callable, List, Dict
+from audit_engine import AuditEngine
+from peer_client import PeerClient
 
 class Auditor:
     """Independent auditor service to monitor blockchain integrity"""
     
-    def __init__(self, node_urls: List[str]):
+    def __init__(self, node_urls: List[str], workers: int = 0, max_dispute_blocks: int = 100):
         self.node_urls = node_urls
+        self.max_dispute_blocks = max_dispute_blocks  # Blocks listed per side of a fork
+        self.engine = AuditEngine(workers)  # 0 = one verification process per core
+        self.peer_client = PeerClient("auditor")
     
     def verify_chain_integrity(self, node_url: str) -> Dict:
-        """Verify blockchain integrity on a specific node"""
-        try:
-            response = requests.get(f"{node_url}/chain", timeout=5)
-            chain_data = response.json()
-            
-            # Verify each block's hash
-            for i, block_data in enumerate(chain_data['chain']):
-                if i > 0:
-                    prev_block = chain_data['chain'][i-1]
-                    if block_data['previous_hash'] != prev_block['hash']:
-                        return {
-                            "valid": False,
-                            "error": f"Chain broken at block {i}",
-                            "node": node_url
-                        }
-            
-            return {
-                "valid": True,
-                "blocks": len(chain_data['chain']),
-                "node": node_url
-            }
-        except Exception as e:
-            return {
-                "valid": False,
-                "error": str(e),
-                "node": node_url
-            }
+        """Verify blockchain integrity on a specific node: hashes, Merkle roots, linkage, difficulty, PoW and signatures"""
+        return self.engine.audit([node_url])[node_url]
     
-    def check_consensus(self) -> Dict:
-        """Check if all nodes have the same blockchain"""
-        chains = {}
+    def check_consensus(self, tips: Dict[str, Dict] = None) -> Dict:
+        """Check if all nodes have the same blockchain and, where they differ, which blocks are in dispute
         
-        for node_url in self.node_urls:
-            try:
-                response = requests.get(f"{node_url}/chain", timeout=5)
-                chain_hash = hash(str(response.json()['chain']))
-                chains[node_url] = {
-                    "hash": chain_hash,
-                    "length": response.json()['length']
-                }
-            except:
-                chains[node_url] = {"error": "Unreachable"}
+        Nodes are compared by tip hash; a node whose tip differs from the
+        most-work node is located by binary search over per-height hashes.
+        This costs one /tip per node (none if `tips` are already known) plus
+        O(log n) single-header requests per disagreeing node.
+        """
+        if tips is None:
+            tips = self.peer_client.fan_out(self.node_urls, lambda node_url: self.peer_client.get(node_url, "/tip"))
+        node_states = {node_url: tips.get(node_url, {"error": "Unreachable"}) for node_url in self.node_urls}
         
-        # Check if all chains match
-        chain_hashes = [v.get("hash") for v in chains.values() if "hash" in v]
-        consensus = len(set(chain_hashes)) <= 1
+        reachable = [node_url for node_url in self.node_urls if "hash" in node_states[node_url]]
+        # The tip hash commits to the whole chain through previous_hash linkage
+        consensus = len({node_states[node_url]["hash"] for node_url in reachable}) <= 1
+        result = {"consensus": consensus, "node_states": node_states, "forks": {}}
+        if consensus:
+            return result
         
-        return {
-            "consensus": consensus,
-            "node_states": chains
-        }
-    
-    def detect_double_voting(self) -> Dict:
-        """Detect if any voter has voted multiple times"""
-        voter_ids = {}
-        double_voters = []
-        
-        for node_url in self.node_urls:
-            try:
-                response = requests.get(f"{node_url}/chain", timeout=5)
-                chain = response.json()['chain']
-                
-                for block in chain:
-                    for vote in block.get('votes', []):
-                        voter_id = vote.get('voter_id')
-                        if voter_id in voter_ids:
-                            double_voters.append(voter_id)
-                        else:
-                            voter_ids[voter_id] = True
-                
-                break  # Only check one node (all should be same)
-            except:
+        reference = max(reachable, key=lambda node_url: node_states[node_url]["work"])
+        reference_hash_at = self._hash_reader(reference)
+        result["reference"] = reference
+        for node_url in reachable:
+            if node_states[node_url]["hash"] == node_states[reference]["hash"]:
                 continue
+            try:
+                common_length = min(node_states[node_url]["length"], node_states[reference]["length"])
+                fork_height = self.find_fork_height(reference_hash_at, self._hash_reader(node_url), common_length)
+                result["forks"][node_url] = self._dispute(reference, node_url, fork_height, node_states)
+            except Exception as e:
+                result["forks"][node_url] = {"error": str(e)}
+        return result
+    
+    @staticmethod
+    def find_fork_height(reference_hash_at: Callable[[int], str], node_hash_at: Callable[[int], str],
+                         common_length: int) -> int:
+        """Lowest height where two chains differ (common_length if one is a prefix of the other)
         
+        Hash linkage makes agreement monotonic: chains that share the block
+        at height h share every block below it, so O(log n) probes suffice.
+        """
+        low, high = 0, common_length
+        while low < high:
+            middle = (low + high) // 2
+            if reference_hash_at(middle) == node_hash_at(middle):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def _hash_reader(self, node_url: str) -> Callable[[int], str]:
+        """Block hash at a height on a node, one cached single-header request at a time"""
+        hashes = {}
+        def hash_at(height: int) -> str:
+            if height not in hashes:
+                headers = self.peer_client.get(node_url, "/headers", {"from": height, "to": height + 1})['headers']
+                hashes[height] = headers[0]['hash']
+            return hashes[height]
+        return hash_at
+    
+    def _dispute(self, reference: str, node_url: str, fork_height: int, node_states: Dict[str, Dict]) -> Dict:
+        """Blocks each side holds above the fork point and the votes only one side has recorded"""
+        sides = {}
+        for side, url in (("reference", reference), ("node", node_url)):
+            length = node_states[url]["length"]
+            end = min(length, fork_height + self.max_dispute_blocks)
+            blocks = (self.peer_client.get_blocks(url, "/blocks", {"from": fork_height, "to": end}, timeout=10)
+                      if end > fork_height else [])
+            sides[side] = {
+                "blocks": [block['hash'] for block in blocks],
+                "count": length - fork_height,
+                "voters": {vote.get("voter_id") for block in blocks for vote in block['votes']}
+            }
         return {
-            "double_voting_detected": len(double_voters) > 0,
-            "double_voters": list(set(double_voters)),
-            "total_unique_voters": len(voter_ids)
+            "fork_height": fork_height,
+            "behind": sides["node"]["count"] == 0,  # A prefix of the reference chain, nothing disputed
+            "reference_blocks": sides["reference"]["blocks"],
+            "node_blocks": sides["node"]["blocks"],
+            "disputed_blocks": sides["reference"]["count"] + sides["node"]["count"],
+            "disputed_votes": len(sides["reference"]["voters"] ^ sides["node"]["voters"]),
+            "truncated": max(sides["reference"]["count"], sides["node"]["count"]) > self.max_dispute_blocks
         }
     
+    def detect_double_voting(self, audits: Dict[str, Dict] = None) -> Dict:
+        """Detect if any voter has voted multiple times (on the first reachable node, all should be same)"""
+        if audits is None:
+            audits = {}
+            for node_url in self.node_urls:
+                audits = self.engine.audit([node_url])
+                if "unique_voters" in audits[node_url]:
+                    break
+        
+        for audit in audits.values():
+            if "unique_voters" in audit:
+                return {
+                    "double_voting_detected": len(audit["double_voters"]) > 0,
+                    "double_voters": audit["double_voters"],
+                    "total_unique_voters": audit["unique_voters"]
+                }
+        return {"double_voting_detected": False, "double_voters": [], "total_unique_voters": 0}
+    
     def generate_audit_report(self) -> Dict:
-        """Generate comprehensive audit report"""
-        report = {
+        """Generate comprehensive audit report from a single concurrent, streamed read of every node's chain"""
+        audits = self.engine.audit(self.node_urls)
+        tips = {node_url: audit["tip"] for node_url, audit in audits.items() if "tip" in audit and audit["blocks"]}
+        
+        return {
             "timestamp": time.time(),
             "nodes_audited": len(self.node_urls),
-            "integrity_checks": [],
-            "consensus_check": self.check_consensus(),
-            "double_voting_check": self.detect_double_voting()
+            "integrity_checks": [audits[node_url] for node_url in self.node_urls],
+            "consensus_check": self.check_consensus(tips),
+            "double_voting_check": self.detect_double_voting(audits)
         }
-        
-        for node_url in self.node_urls:
-            integrity = self.verify_chain_integrity(node_url)
-            report["integrity_checks"].append(integrity)
-        
-        return report
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from block import Block
+from crypto_utils import CryptoUtils
+from miner import ParallelMiner, mine_header
+
+def make_votes(count: int):
+    """Build signed sample votes"""
+    votes = []
+    for i in range(count):
+        vote = {
+            "voter_id": CryptoUtils.hash_voter_id(f"voter{i}@example.com"),
+            "candidate": f"Candidate {'ABC'[i % 3]}",
+            "timestamp": time.time()
+        }
+        vote["signature"] = CryptoUtils.sign_vote(vote)
+        votes.append(vote)
+    return votes
+
+def legacy_hash_loop(block: Block, attempts: int):
+    """Original mining loop: re-serialize the whole block on every nonce"""
+    for nonce in range(attempts):
+        block_string = json.dumps({
+            "index": block.index,
+            "votes": block.votes,
+            "timestamp": block.timestamp,
+            "previous_hash": block.previous_hash,
+            "nonce": nonce
+        }, sort_keys=True)
+        hashlib.sha256(block_string.encode()).hexdigest()
+
+def bench_mining(votes_per_block: int = 300, seconds: float = 2.0):
+    """Compare hash rate of the legacy loop against the midstate miner"""
+    block = Block(1, make_votes(votes_per_block), "0" * 64)
+
+    # Calibrate the legacy loop on a small run, then time a full window
+    attempts = 100
+    start = time.perf_counter()
+    legacy_hash_loop(block, attempts)
+    per_attempt = (time.perf_counter() - start) / attempts
+    attempts = max(1, int(seconds / per_attempt))
+    start = time.perf_counter()
+    legacy_hash_loop(block, attempts)
+    legacy_rate = attempts / (time.perf_counter() - start)
+
+    # Difficulty 256 is never met, so the miner runs the full attempt budget
+    header = block.header_bytes()
+    attempts = max(1, int(legacy_rate * seconds * 50))
+    start = time.perf_counter()
+    mine_header(header, 256, 0, attempts)
+    midstate_rate = attempts / (time.perf_counter() - start)
+
+    print(f"Votes per block:  {votes_per_block}")
+    print(f"Legacy loop:      {legacy_rate:,.0f} H/s")
+    print(f"Midstate miner:   {midstate_rate:,.0f} H/s")
+    print(f"Speedup:          {midstate_rate / legacy_rate:.1f}x")
+
+def bench_parallel(workers: int = 0, seconds: float = 2.0):
+    """Measure per-worker and aggregate hash rate of the parallel miner"""
+    miner = ParallelMiner(workers)
+    block = Block(1, make_votes(300), "0" * 64)
+    threading.Timer(seconds, miner.cancel).start()
+    miner.mine(block.header_bytes(), 256)
+
+    for stat in miner.last_stats:
+        print(f"Worker {stat['worker']}:  {stat['hash_rate']:,.0f} H/s")
+    print(f"Total:     {sum(stat['hash_rate'] for stat in miner.last_stats):,.0f} H/s")
+
+if __name__ == "__main__":
+    benchmark = sys.argv[1] if len(sys.argv) > 1 else "mining"
+    if benchmark == "mining":
+        bench_mining(int(sys.argv[2]) if len(sys.argv) > 2 else 300)
+    elif benchmark == "parallel":
+        bench_parallel(int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+    else:
+        print(f"Unknown benchmark: {benchmark}")
@@ -1,37 +1,140 @@
 import hashlib
 import json
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable
+from merkle import EMPTY_ROOT, build_levels, hash_vote, merkle_proof, merkle_root, verify_merkle_proof
+from miner import ParallelMiner, difficulty_target, mine_header
+
+# Proof-of-work difficulty is counted in leading zero bits of the block hash
+DEFAULT_DIFFICULTY = 16  # Four leading hex zeros
+MIN_DIFFICULTY = 8  # Retargeting never goes below this
 
 class Block:
     """Represents a single block in the blockchain"""
     
-    def __init__(self, index: int, votes: List[Dict], previous_hash: str, timestamp: float = None):
+    def __init__(self, index: int, votes: List[Dict], previous_hash: str, timestamp: float = None,
+                 difficulty: int = DEFAULT_DIFFICULTY):
         self.index = index
         self.votes = votes
         self.timestamp = timestamp or time.time()
         self.previous_hash = previous_hash
+        self.difficulty = difficulty
+        self.merkle_root = merkle_root(votes)
         self.nonce = 0
+        self._merkle_levels = None
         self.hash = self.calculate_hash()
     
-    def calculate_hash(self) -> str:
-        """Calculate SHA-256 hash of block contents"""
-        block_string = json.dumps({
+    @staticmethod
+    def meets_difficulty(block_hash: str, difficulty: int) -> bool:
+        """Proof-of-work check: hash has at least `difficulty` leading zero bits"""
+        return int(block_hash, 16) < difficulty_target(difficulty)
+    
+    @staticmethod
+    def hash_header(header: Dict, nonce: int) -> str:
+        """SHA-256 of a serialized header followed by the decimal nonce"""
+        header_string = json.dumps(header, sort_keys=True)
+        return hashlib.sha256(header_string.encode() + b"%d" % nonce).hexdigest()
+    
+    def header(self) -> Dict:
+        """Fixed-size hashed fields; votes are committed through the Merkle root"""
+        return {
             "index": self.index,
-            "votes": self.votes,
+            "merkle_root": self.merkle_root,
             "timestamp": self.timestamp,
             "previous_hash": self.previous_hash,
-            "nonce": self.nonce
-        }, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
-    
-    def mine_block(self, difficulty: int = 4):
-        """Mine block using Proof of Work"""
-        target = "0" * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
+            "difficulty": self.difficulty
+        }
+    
+    @staticmethod
+    def verify_header(header_data: Dict) -> bool:
+        """Check a header_dict's hash and proof of work (at its declared difficulty) without the block body"""
+        header = {field: header_data[field]
+                  for field in ("index", "merkle_root", "timestamp", "previous_hash", "difficulty")}
+        block_hash = Block.hash_header(header, header_data["nonce"])
+        return block_hash == header_data["hash"] and Block.meets_difficulty(block_hash, header["difficulty"])
+    
+    def header_bytes(self) -> bytes:
+        """Serialize every hashed field except the nonce"""
+        return json.dumps(self.header(), sort_keys=True).encode()
+    
+    def calculate_hash(self) -> str:
+        """Calculate SHA-256 hash of block contents, re-deriving the Merkle root from the votes"""
+        header = self.header()
+        header["merkle_root"] = merkle_root(self.votes)
+        return Block.hash_header(header, self.nonce)
+    
+    def mine_block(self, miner: ParallelMiner = None, is_stale: Callable[[], bool] = None) -> bool:
+        """Mine block using Proof of Work at its declared difficulty, returns False if the miner was cancelled
+        
+        With a miner, `is_stale` aborts the search once it returns True.
+        """
+        if miner is None:
+            self.nonce, self.hash, _ = mine_header(self.header_bytes(), self.difficulty, self.nonce)
+        else:
+            nonce, block_hash = miner.mine(self.header_bytes(), self.difficulty, self.nonce, is_stale)
+            if nonce is None:
+                print(f"Mining of block {self.index} cancelled")
+                return False
+            self.nonce, self.hash = nonce, block_hash
         print(f"Block mined: {self.hash}")
+        return True
+    
+    def inclusion_proof(self, position: int) -> Dict:
+        """Merkle inclusion proof for the vote at `position`"""
+        if self._merkle_levels is None:
+            self._merkle_levels = build_levels([hash_vote(vote) for vote in self.votes])
+        return {
+            "block_index": self.index,
+            "block_hash": self.hash,
+            "header": self.header(),
+            "nonce": self.nonce,
+            "position": position,
+            "vote": self.votes[position],
+            "proof": merkle_proof(self._merkle_levels, position)
+        }
+    
+    @staticmethod
+    def verify_inclusion(proof_data: Dict, min_difficulty: int = MIN_DIFFICULTY) -> bool:
+        """Check an inclusion proof against the block header it claims to belong to"""
+        header = proof_data["header"]
+        block_hash = Block.hash_header(header, proof_data["nonce"])
+        if block_hash != proof_data["block_hash"]:
+            return False
+        # The header's declared difficulty is hashed, but a client without the chain can only bound it from below
+        if header["difficulty"] < min_difficulty or not Block.meets_difficulty(block_hash, header["difficulty"]):
+            return False
+        return verify_merkle_proof(hash_vote(proof_data["vote"]), proof_data["proof"], header["merkle_root"])
+    
+    def header_dict(self) -> Dict:
+        """Header plus nonce and hash: enough to check linkage and PoW without the votes"""
+        return {**self.header(), "nonce": self.nonce, "hash": self.hash}
+    
+    @classmethod
+    def from_dict(cls, block_data: Dict) -> "Block":
+        """Rebuild a block received from a peer or read from disk
+        
+        The stored hash and Merkle root are taken as-is; validation
+        (calculate_hash) re-derives both from the votes.
+        """
+        block = cls.__new__(cls)
+        block.index = block_data['index']
+        block.votes = block_data['votes']
+        block.timestamp = block_data['timestamp']
+        block.previous_hash = block_data['previous_hash']
+        block.difficulty = block_data['difficulty']
+        block.merkle_root = block_data.get('merkle_root') or merkle_root(block.votes)
+        block.nonce = block_data['nonce']
+        block.hash = block_data['hash']
+        block._merkle_levels = None
+        return block
+    
+    @classmethod
+    def from_header(cls, header_data: Dict) -> "Block":
+        """Header-only block whose votes (body) have not been downloaded yet"""
+        block = cls.from_dict({**header_data, "votes": None})
+        if block.merkle_root == EMPTY_ROOT:
+            block.votes = []
+        return block
     
     def to_dict(self) -> Dict:
         """Convert block to dictionary"""
@@ -40,6 +143,8 @@ class Block:
             "votes": self.votes,
             "timestamp": self.timestamp,
             "previous_hash": self.previous_hash,
+            "merkle_root": self.merkle_root,
+            "difficulty": self.difficulty,
             "nonce": self.nonce,
             "hash": self.hash
         }
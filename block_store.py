@@ -0,0 +1,177 @@
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional
+
+# Index entry per height: segment number, byte offset, record length
+INDEX_ENTRY = struct.Struct(">IQI")
+
+class BlockStore:
+    """Durable append-only block log: segment files plus a fixed-width offset index
+
+    Blocks are appended as JSON records to `segment-NNNNN.log`
+    files; `index.dat` maps height -> (segment, offset, length) so any block
+    can be read by height through a memory map. Writes are fsync'd in
+    batches, and `checkpoint` records the height known to be durable, so a
+    restart only needs to re-verify the tail past it.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024, sync_every: int = 16):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_every = sync_every
+        os.makedirs(directory, exist_ok=True)
+        self._entries: List[tuple] = []
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._unsynced = 0
+        self._load_index()
+        self._open_for_append()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:05d}.log")
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.dat")
+
+    @property
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.directory, "checkpoint")
+
+    def _load_index(self):
+        """Read the offset index, dropping a torn trailing entry or records missing from disk"""
+        try:
+            with open(self._index_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        entries = list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+        sizes = {}
+        for height, (segment, offset, length) in enumerate(entries):
+            if segment not in sizes:
+                path = self._segment_path(segment)
+                sizes[segment] = os.path.getsize(path) if os.path.exists(path) else -1
+            if offset + length > sizes[segment]:
+                entries = entries[:height]
+                break
+        self._entries = entries
+
+    def _open_for_append(self):
+        """Open the index and the active segment, cutting both back to the last good entry"""
+        if self._entries:
+            segment, offset, length = self._entries[-1]
+            end = offset + length
+        else:
+            segment, end = 0, 0
+        self._segment = segment
+        self._segment_file = open(self._segment_path(segment), "ab+")
+        self._segment_file.truncate(end)
+        self._index_file = open(self._index_path, "ab+")
+        self._index_file.truncate(len(self._entries) * INDEX_ENTRY.size)
+        # Later segments can only hold records past the last good entry
+        later = segment + 1
+        while os.path.exists(self._segment_path(later)):
+            os.remove(self._segment_path(later))
+            later += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def checkpoint(self) -> int:
+        """Number of blocks known to be durable at the last batch sync"""
+        try:
+            with open(self._checkpoint_path) as f:
+                return min(int(f.read().strip() or 0), len(self._entries))
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def append(self, block_data: Dict):
+        """Append one block record; fsyncs once every `sync_every` appends"""
+        record = json.dumps(block_data, separators=(",", ":")).encode()
+        self._segment_file.seek(0, os.SEEK_END)
+        offset = self._segment_file.tell()
+        if offset and offset + len(record) > self.segment_size:
+            self._roll_segment()
+            offset = 0
+        self._segment_file.write(record)
+        entry = (self._segment, offset, len(record))
+        self._index_file.seek(0, os.SEEK_END)
+        self._index_file.write(INDEX_ENTRY.pack(*entry))
+        self._entries.append(entry)
+
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+
+    def _roll_segment(self):
+        """Seal the active segment and start the next one"""
+        self.sync()
+        self._segment_file.close()
+        self._segment += 1
+        self._segment_file = open(self._segment_path(self._segment), "ab+")
+
+    def sync(self):
+        """Flush and fsync pending writes, then advance the checkpoint"""
+        if not self._unsynced:
+            return
+        for f in (self._segment_file, self._index_file):
+            f.flush()
+            os.fsync(f.fileno())
+        self._unsynced = 0
+        temp_path = self._checkpoint_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(str(len(self._entries)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._checkpoint_path)
+
+    def truncate(self, height: int):
+        """Drop every block from `height` onward (chain reorganization)"""
+        if height >= len(self._entries):
+            return
+        segment, offset, _ = self._entries[height]
+        self._entries = self._entries[:height]
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps = {}
+        self._segment_file.close()
+        for later in range(segment + 1, self._segment + 1):
+            os.remove(self._segment_path(later))
+        self._segment = segment
+        self._segment_file = open(self._segment_path(segment), "ab+")
+        self._segment_file.truncate(offset)
+        self._index_file.truncate(height * INDEX_ENTRY.size)
+        self._unsynced += 1
+        self.sync()
+
+    def read(self, height: int) -> Optional[Dict]:
+        """Random access to one block by height through the segment's memory map"""
+        if height < 0 or height >= len(self._entries):
+            return None
+        segment, offset, length = self._entries[height]
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < offset + length:
+            if segment == self._segment:
+                self._segment_file.flush()
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return json.loads(mapped[offset:offset + length])
+
+    def iter_blocks(self, start: int = 0) -> Iterator[Dict]:
+        """Yield stored blocks in height order"""
+        for height in range(start, len(self._entries)):
+            yield self.read(height)
+
+    def close(self):
+        """Sync and release file handles"""
+        self.sync()
+        for mapped in self._maps.values():
+            mapped.close()
+        self._segment_file.close()
+        self._index_file.close()
@@ -1,23 +1,126 @@
 import json
-from typing import List, Dict, Optional
-from block import Block
+import math
+import threading
+import time
+from typing import Callable, List, Dict, Optional, Set, Tuple
+from block import Block, DEFAULT_DIFFICULTY, MIN_DIFFICULTY
+from block_store import BlockStore
+from chain_view import ChainView
+from mempool import Mempool
+from miner import ParallelMiner, block_work
+from snapshot import build_snapshot
+
+# Fixed genesis block shared by every node, so independent nodes never fork at height 0
+GENESIS_TIMESTAMP = 1735689600.0
+GENESIS_NONCE = 89649
+
+# A block's timestamp must be later than the median of this many preceding blocks
+MEDIAN_TIME_BLOCKS = 11
+# and no more than this many seconds ahead of the validating node's clock
+MAX_FUTURE_DRIFT = 120.0
+
+def retarget(difficulty: int, actual_span: float, expected_span: float, min_difficulty: int = MIN_DIFFICULTY) -> int:
+    """Difficulty for the next window, in whole bits, from how long the last window took
+    
+    The observed span is clamped to a factor of four either way, so one
+    window moves difficulty by at most two bits.
+    """
+    actual_span = min(max(actual_span, expected_span / 4), expected_span * 4)
+    return max(min_difficulty, difficulty + round(math.log2(expected_span / actual_span)))
 
 class Blockchain:
-    """Manages the blockchain of votes"""
+    """Manages the blockchain of votes
     
-    def __init__(self):
+    Single writer: every mutation (votes, blocks, reorgs) runs under `lock`.
+    Readers never take it for chain data; they use `view`, an immutable
+    snapshot the writer republishes after each block change. Voter index
+    lookups are single dict reads of entries that are replaced, never
+    edited in place, so they are safe without the lock too.
+    """
+    
+    def __init__(self, store: BlockStore = None, mempool: Mempool = None):
         self.chain: List[Block] = []
-        self.pending_votes: List[Dict] = []
-        self.difficulty = 4
+        self.chain_work: List[int] = []  # Cumulative proof of work per height, for fork choice
+        self.mempool = mempool if mempool is not None else Mempool()  # Pending votes by voter_id
+        self.max_block_votes = 500  # Largest block template
+        self.difficulty = DEFAULT_DIFFICULTY  # Initial difficulty in leading zero bits, declared by genesis
+        self.retarget_interval = 10  # Recompute difficulty every N blocks
+        self.target_block_time = 2.0  # Seconds between blocks that retargeting steers toward
+        self.max_block_gap = 2  # A gap between blocks counts as at most this many target block times
+        self.min_difficulty = MIN_DIFFICULTY
         self.mining_reward = 1
-        self.voter_ids = set()  # Track voters to prevent double voting
-        self.create_genesis_block()
+        self.voter_index: Dict[str, Dict] = {}  # voter_id -> status/location, prevents double voting
+        self.vote_count: Dict[str, int] = {}  # Running tally of confirmed votes
+        self.verified_height = 0  # Blocks up to this height have passed validation
+        self.store = store  # Optional durable block log
+        self.snapshot_interval = 100  # Take a state snapshot every N blocks
+        self.latest_snapshot: Optional[Dict] = None
+        self.backfill_height = 0  # After a snapshot bootstrap, bodies up to here are still missing
+        self._bootstrap_snapshot: Optional[Dict] = None
+        # Guards chain, mempool and indexes against request threads, the miner and sync running concurrently
+        self.lock = threading.RLock()
+        self.view: ChainView = None
+        if store is not None and len(store):
+            self.load_from_store()
+        else:
+            self.create_genesis_block()
     
     def create_genesis_block(self):
-        """Create the first block in the chain"""
-        genesis_block = Block(0, [], "0")
-        genesis_block.mine_block(self.difficulty)
-        self.chain.append(genesis_block)
+        """Create the first block in the chain (pre-mined, identical on every node)"""
+        genesis_block = Block(0, [], "0", GENESIS_TIMESTAMP, DEFAULT_DIFFICULTY)
+        genesis_block.nonce = GENESIS_NONCE
+        genesis_block.hash = genesis_block.calculate_hash()
+        self.append_block(genesis_block)
+    
+    def load_from_store(self):
+        """Resume from the local block log, verifying only blocks past its checkpoint"""
+        checkpoint = self.store.checkpoint()
+        for height in range(len(self.store)):
+            try:
+                block = Block.from_dict(self.store.read(height))
+            except (ValueError, KeyError, TypeError) as e:
+                if height < checkpoint:
+                    raise
+                # A record torn by a crash before it was synced
+                error = f"Unreadable record ({e})"
+            else:
+                error = None
+                if height >= checkpoint and height > 0:
+                    error = self.validate_block(block, self.chain[-1], self.next_difficulty(), self.next_min_timestamp())
+            if error:
+                print(f"{error} at stored block {height}, discarding the rest of the log")
+                self.store.truncate(height)
+                break
+            self.chain.append(block)
+            self._add_work(block)
+            self._apply_block(block)
+        if not self.chain:
+            self.create_genesis_block()
+            return
+        self.verified_height = len(self.chain) - 1
+        self._publish()
+        print(f"Loaded {len(self.chain)} blocks from disk (checkpoint {checkpoint})")
+    
+    def _publish(self):
+        """Swap in a fresh read snapshot (writer only)"""
+        self.view = ChainView.capture(self.chain, self.chain_work, self.vote_count,
+                                      self.latest_snapshot, self.backfill_height)
+    
+    @property
+    def pending_votes(self) -> List[Dict]:
+        """Pending votes in arrival order (read-only view of the mempool)"""
+        with self.lock:
+            return list(self.mempool)
+    
+    def get_pending(self, limit: int) -> List[Dict]:
+        """The `limit` oldest pending votes"""
+        with self.lock:
+            return self.mempool.select_template(limit)
+    
+    def block_due_info(self) -> Tuple[int, Optional[float]]:
+        """Number of pending votes and arrival time of the oldest, read consistently"""
+        with self.lock:
+            return len(self.mempool), self.mempool.oldest_arrival()
     
     def get_latest_block(self) -> Block:
         """Get the most recent block"""
@@ -25,10 +128,14 @@ class Blockchain:
     
     def add_vote(self, vote: Dict) -> Dict:
         """Add a vote to pending votes (Producer action)"""
+        with self.lock:
+            return self._add_vote(vote)
+    
+    def _add_vote(self, vote: Dict) -> Dict:
         voter_id = vote.get("voter_id")
         
         # Check for double voting
-        if voter_id in self.voter_ids:
+        if voter_id in self.voter_index:
             return {
                 "success": False,
                 "message": "Voter has already cast a vote",
@@ -43,8 +150,17 @@ class Blockchain:
                 "message": "Invalid vote structure"
             }
         
-        self.pending_votes.append(vote)
-        self.voter_ids.add(voter_id)
+        accepted, evicted = self.mempool.add(vote)
+        for old_vote in evicted:
+            # An evicted voter may submit again later
+            self.voter_index.pop(old_vote.get("voter_id"), None)
+        if not accepted:
+            return {
+                "success": False,
+                "message": "Pending vote pool is full, try again later",
+                "voter_id": voter_id
+            }
+        self.voter_index[voter_id] = self._pending_entry()
         
         return {
             "success": True,
@@ -52,65 +168,394 @@ class Blockchain:
             "vote_id": vote.get("voter_id")
         }
     
-    def mine_pending_votes(self, miner_address: str) -> bool:
+    def add_votes(self, votes: List[Dict]) -> List[Dict]:
+        """Add a batch of votes, returning one result per vote in order
+        
+        Duplicates inside the batch are caught like any other double vote,
+        since each accepted vote enters the voter index before the next is checked.
+        """
+        with self.lock:
+            return [
+                self._add_vote(vote) if isinstance(vote, dict)
+                else {"success": False, "message": "Invalid vote structure"}
+                for vote in votes
+            ]
+    
+    def mine_pending_votes(self, miner_address: str, miner: ParallelMiner = None) -> bool:
         """Mine pending votes into a new block (Consumer action)"""
-        if not self.pending_votes:
+        new_block = self.create_template()
+        if new_block is None:
+            return False
+        
+        # Mine the block without holding the lock (keep pending votes if the search was cancelled)
+        if not new_block.mine_block(miner):
             return False
         
-        # Create new block with pending votes
-        new_block = Block(
-            index=len(self.chain),
-            votes=self.pending_votes.copy(),
-            previous_hash=self.get_latest_block().hash
-        )
+        if not self.commit_block(new_block):
+            return False
+        print(f"Block {new_block.index} mined by {miner_address}")
+        return True
+    
+    def difficulty_for(self, height: int, header_at: Callable[[int], Tuple[float, int]]) -> int:
+        """Difficulty a block at `height` must declare
         
-        # Mine the block
-        new_block.mine_block(self.difficulty)
+        `header_at(h)` returns (timestamp, difficulty) of the block at height
+        h on the chain being checked. Difficulty carries over from the
+        previous block except at every `retarget_interval`-th height, where
+        it is recomputed from the timestamps of the preceding window (genesis,
+        whose timestamp is fixed, never takes part).
         
-        # Add to chain
-        self.chain.append(new_block)
+        Nodes only mine once votes are pending, so a long gap between blocks
+        usually measures an idle election, not a drop in hash rate. Each gap
+        is therefore capped at `max_block_gap` target block times before the
+        window is summed: idle periods no longer drag difficulty down (and
+        cumulative work with it), while a window of uniformly slow blocks
+        still lowers it by a bit.
+        """
+        if height <= 1:
+            return self.difficulty
+        _, previous_difficulty = header_at(height - 1)
+        if height % self.retarget_interval or height <= self.retarget_interval:
+            return previous_difficulty
+        max_gap = self.max_block_gap * self.target_block_time
+        timestamps = [header_at(h)[0] for h in range(height - 1 - self.retarget_interval, height)]
+        span = sum(min(max(later - earlier, 0.0), max_gap) for earlier, later in zip(timestamps, timestamps[1:]))
+        return retarget(previous_difficulty, span, self.retarget_interval * self.target_block_time, self.min_difficulty)
+    
+    def median_time_past(self, height: int, header_at: Callable[[int], Tuple[float, int]]) -> float:
+        """Median timestamp of the `MEDIAN_TIME_BLOCKS` blocks below `height`, which a block there must exceed"""
+        timestamps = sorted(header_at(h)[0] for h in range(max(0, height - MEDIAN_TIME_BLOCKS), height))
+        return timestamps[len(timestamps) // 2]
+    
+    def next_difficulty(self) -> int:
+        """Difficulty of the next block on our own chain (writer side)"""
+        chain = self.chain
+        return self.difficulty_for(len(chain), lambda h: (chain[h].timestamp, chain[h].difficulty))
+    
+    def next_min_timestamp(self) -> float:
+        """Median time past the next block on our own chain must exceed (writer side)"""
+        chain = self.chain
+        return self.median_time_past(len(chain), lambda h: (chain[h].timestamp, chain[h].difficulty))
+    
+    def next_timestamp(self) -> float:
+        """Timestamp for a new template: the local clock, nudged past the median time past if it lags"""
+        return max(time.time(), self.next_min_timestamp() + 0.001)
+    
+    def create_template(self, exclude: Set[str] = frozenset()) -> Optional[Block]:
+        """Unmined block on the current tip from an atomic snapshot of the oldest pending votes
         
-        # Clear pending votes
-        self.pending_votes = []
+        `exclude` skips votes already in a block being mined, so the next
+        template can be prepared while that block's proof of work runs.
+        """
+        with self.lock:
+            votes = self.mempool.select_template(self.max_block_votes, exclude)
+            tip = self.get_latest_block()
+            difficulty = self.next_difficulty()
+            timestamp = self.next_timestamp()
+        if not votes:
+            return None
+        # The Merkle tree is built outside the lock
+        return Block(tip.index + 1, votes, tip.hash, timestamp, difficulty)
+    
+    def refresh_template(self, template: Optional[Block]) -> Optional[Block]:
+        """Re-point a template prepared during the previous block's mining at the current tip
         
-        print(f"Block {new_block.index} mined by {miner_address}")
-        return True
+        The template (and its Merkle tree) is reused if every vote in it is
+        still pending and it is as full as the mempool now allows; otherwise
+        a fresh template is built.
+        """
+        with self.lock:
+            tip = self.get_latest_block()
+            reusable = (
+                template is not None
+                and all(vote.get("voter_id") in self.mempool for vote in template.votes)
+                and len(template.votes) == min(self.max_block_votes, len(self.mempool))
+            )
+            if reusable:
+                template.index = tip.index + 1
+                template.previous_hash = tip.hash
+                template.timestamp = self.next_timestamp()
+                template.difficulty = self.next_difficulty()
+                template.nonce = 0
+                return template
+        return self.create_template()
     
-    def is_chain_valid(self) -> bool:
-        """Verify blockchain integrity (Auditor action)"""
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-            
-            # Verify hash
-            if current_block.hash != current_block.calculate_hash():
-                print(f"Invalid hash at block {i}")
+    def commit_block(self, block: Block) -> bool:
+        """Append a locally mined block if it still extends the tip and its votes are all still pending"""
+        with self.lock:
+            tip = self.get_latest_block()
+            if block.index != tip.index + 1 or block.previous_hash != tip.hash:
+                print(f"Block {block.index} is stale, the tip moved while it was mined")
                 return False
-            
-            # Verify chain linkage
-            if current_block.previous_hash != previous_block.hash:
-                print(f"Invalid previous hash at block {i}")
+            if not all(vote.get("voter_id") in self.mempool for vote in block.votes):
+                print(f"Block {block.index} includes votes that were confirmed while it was mined")
                 return False
-            
-            # Verify proof of work
-            if not current_block.hash.startswith("0" * self.difficulty):
-                print(f"Invalid proof of work at block {i}")
+            # Only the included votes leave the mempool, as the block is applied
+            self.append_block(block)
+            return True
+    
+    def append_block(self, block: Block):
+        """Append a block to the chain and fold its votes into the tally"""
+        with self.lock:
+            self._append_block(block)
+            self._publish()
+    
+    def block_work(self, block: Block) -> int:
+        """Proof of work a block contributes to its chain"""
+        return block_work(block.difficulty)
+    
+    def _add_work(self, block: Block):
+        self.chain_work.append((self.chain_work[-1] if self.chain_work else 0) + self.block_work(block))
+    
+    def _append_block(self, block: Block):
+        self.chain.append(block)
+        self._add_work(block)
+        self._apply_block(block)
+        if self.store is not None and not self.backfill_height:
+            self.store.append(block.to_dict())
+        if block.index and block.index % self.snapshot_interval == 0:
+            self.latest_snapshot = build_snapshot(block.index, block.hash, self.vote_count, self.voter_index)
+    
+    @staticmethod
+    def _pending_entry() -> Dict:
+        """Voter index entry for a vote still in the pending pool"""
+        return {"status": "pending", "block": None, "position": None}
+    
+    def _restore_pending(self, votes: List[Dict], arrival: float = None):
+        """Put votes back into the mempool unless the chain already confirms them"""
+        votes = [vote for vote in votes if vote.get("voter_id") not in self.voter_index]
+        self.mempool.requeue(votes, arrival)
+        for vote in votes:
+            self.voter_index[vote.get("voter_id")] = self._pending_entry()
+    
+    def _apply_block(self, block: Block):
+        """Count a block's votes, index where each voter's vote landed and drop them from the mempool"""
+        for position, vote in enumerate(block.votes):
+            candidate = vote.get("candidate")
+            if candidate:
+                self.vote_count[candidate] = self.vote_count.get(candidate, 0) + 1
+            self.voter_index[vote.get("voter_id")] = {
+                "status": "confirmed",
+                "block": block.index,
+                "position": position
+            }
+        self.mempool.remove_many(vote.get("voter_id") for vote in block.votes)
+    
+    def _revert_block(self, block: Block):
+        """Uncount a block's votes"""
+        for vote in block.votes:
+            candidate = vote.get("candidate")
+            if candidate:
+                self.vote_count[candidate] -= 1
+                if not self.vote_count[candidate]:
+                    del self.vote_count[candidate]
+            self.voter_index.pop(vote.get("voter_id"), None)
+    
+    def replace_chain(self, new_chain: List[Block]) -> Tuple[List[Block], List[Block]]:
+        """Switch to another chain, adjusting state only by the blocks past the fork point"""
+        with self.lock:
+            fork_height = 0
+            while (fork_height < min(len(self.chain), len(new_chain))
+                   and self.chain[fork_height].hash == new_chain[fork_height].hash):
+                fork_height += 1
+            return self.replace_suffix(fork_height, new_chain[fork_height:])
+    
+    def replace_suffix(self, fork_height: int, added: List[Block]) -> Tuple[List[Block], List[Block]]:
+        """Roll back blocks from `fork_height` onward and append `added` in their place
+        
+        Fork choice is by cumulative work: the new suffix must carry more
+        work than the one it replaces, otherwise ValueError is raised.
+        """
+        with self.lock:
+            if self.backfill_height and fork_height <= self.backfill_height:
+                raise ValueError(f"Cannot reorg below snapshot height {self.backfill_height} before history is backfilled")
+            current_work = self.chain_work[-1] - (self.chain_work[fork_height - 1] if fork_height > 0 else 0)
+            if sum(self.block_work(block) for block in added) <= current_work:
+                raise ValueError(f"Fork at height {fork_height} does not carry more work than the current chain")
+            removed = self.chain[fork_height:]
+            if self.latest_snapshot and self.latest_snapshot["height"] >= fork_height:
+                self.latest_snapshot = None
+            # A reorg below the watermark invalidates everything past the common ancestor
+            self.verified_height = min(self.verified_height, max(fork_height - 1, 0))
+            for block in reversed(removed):
+                self._revert_block(block)
+            self.chain = self.chain[:fork_height]
+            self.chain_work = self.chain_work[:fork_height]
+            if self.store is not None:
+                self.store.truncate(fork_height)
+            for block in added:
+                self._append_block(block)
+        
+            # Votes the new blocks confirmed already left the mempool; re-queue votes orphaned by the rollback
+            self._restore_pending([vote for block in removed for vote in block.votes])
+            self._publish()
+        
+            return removed, added
+    
+    def is_chain_valid(self, deep: bool = False) -> bool:
+        """Verify blockchain integrity (Auditor action)
+        
+        Only blocks above the verified-height watermark are checked unless
+        `deep` is set, which re-audits the whole chain from genesis.
+        """
+        view = self.view
+        start = 1 if deep else self.verified_height + 1
+        for i in range(start, view.length):
+            blocks = view.blocks
+            header_at = lambda h: (blocks[h].timestamp, blocks[h].difficulty)
+            error = self.validate_block(blocks[i], blocks[i - 1], self.difficulty_for(i, header_at),
+                                        self.median_time_past(i, header_at))
+            if error:
+                print(f"{error} at block {i}")
+                with self.lock:
+                    self.verified_height = min(self.verified_height, i - 1)
                 return False
         
+        with self.lock:
+            # Only advance the watermark if no reorg replaced the chain meanwhile
+            if self.view is view:
+                self.verified_height = max(self.verified_height, view.length - 1)
         return True
     
+    @staticmethod
+    def validate_block(current_block: Block, previous_block: Block, difficulty: int,
+                       min_timestamp: float = None) -> Optional[str]:
+        """Check a block's hash, linkage, timestamp, declared difficulty and proof of work, returning an error or None
+        
+        `min_timestamp` is the median time past of the blocks below; the
+        timestamp must exceed it and not run ahead of the local clock by
+        more than MAX_FUTURE_DRIFT.
+        """
+        # Verify hash (blocks still waiting for their body are checked against the header)
+        if current_block.votes is None:
+            if not Block.verify_header(current_block.header_dict()):
+                return "Invalid hash"
+        elif current_block.hash != current_block.calculate_hash():
+            return "Invalid hash"
+        
+        # Verify chain linkage
+        if current_block.index != previous_block.index + 1:
+            return "Invalid index"
+        if current_block.previous_hash != previous_block.hash:
+            return "Invalid previous hash"
+        
+        # Verify timestamp: retargeting reads it, so it must not be rewound or run far ahead
+        if min_timestamp is not None and current_block.timestamp <= min_timestamp:
+            return "Timestamp not after median time past"
+        if current_block.timestamp > time.time() + MAX_FUTURE_DRIFT:
+            return "Timestamp too far in the future"
+        
+        # Verify proof of work against the difficulty the retargeting schedule requires here
+        if current_block.difficulty != difficulty:
+            return "Invalid difficulty"
+        if not Block.meets_difficulty(current_block.hash, current_block.difficulty):
+            return "Invalid proof of work"
+        
+        return None
+    
     def get_vote_count(self) -> Dict[str, int]:
-        """Count votes for each candidate"""
-        vote_count = {}
+        """Count votes for each candidate (maintained incrementally as blocks are appended)"""
+        return dict(self.view.tally)
+    
+    def get_voter_status(self, voter_id: str) -> Optional[Dict]:
+        """Index lookup: pending/confirmed status and block position of a voter's vote (lock-free)"""
+        entry = self.voter_index.get(voter_id)
+        return dict(entry) if entry else None
+    
+    def get_vote_proof(self, voter_id: str) -> Optional[Dict]:
+        """Merkle inclusion proof for a voter's vote, or None if it is not in a block"""
+        entry = self.voter_index.get(voter_id)
+        view = self.view
+        if not entry or entry["status"] != "confirmed" or entry["block"] >= view.length:
+            return None
+        block = view.blocks[entry["block"]]
+        # The index may already describe a newer chain than this view
+        if block.votes is None or block.votes[entry["position"]].get("voter_id") != voter_id:
+            return None
+        return block.inclusion_proof(entry["position"])
+    
+    def get_tip(self) -> Dict:
+        """Cheap probe of the chain tip"""
+        return self.view.tip_info()
+    
+    def get_blocks(self, start: int = 0, end: int = None) -> List[Dict]:
+        """Blocks with heights in [start, end), stopping at the first body not yet backfilled"""
+        return self.view.get_blocks(start, end)
+    
+    def get_headers(self, start: int = 0, end: int = None) -> List[Dict]:
+        """Headers (without votes) with heights in [start, end)"""
+        return self.view.get_headers(start, end)
+    
+    def install_snapshot(self, snapshot: Dict, headers: List[Dict]):
+        """Bootstrap from a verified snapshot: header-only history, state taken from the snapshot"""
+        with self.lock:
+            height = snapshot["height"]
+            self.chain = [Block.from_header(header) for header in headers[:height + 1]]
+            self.chain_work = []
+            for block in self.chain:
+                self._add_work(block)
+            self.vote_count = dict(snapshot["tally"])
+            oldest = self.mempool.oldest_arrival()
+            pending_votes = self.mempool.clear()
+            self.voter_index = {
+                voter_id: {"status": "confirmed", "block": block_height, "position": position}
+                for voter_id, (block_height, position) in snapshot["voters"].items()
+            }
+            self._restore_pending(pending_votes, oldest)
+            self.verified_height = height
+            self.latest_snapshot = snapshot
+            self._bootstrap_snapshot = snapshot
+            self.backfill_height = height
+            if self.store is not None:
+                self.store.truncate(0)  # Rewritten once the history is backfilled
+            self._publish()
+            print(f"Bootstrapped from snapshot at height {height}")
+    
+    def fill_bodies(self, blocks: List[Block]):
+        """Attach downloaded bodies to header-only blocks below the snapshot height"""
+        with self.lock:
+            for block in blocks:
+                target = self.chain[block.index]
+                if target.votes is None and target.hash == block.hash:
+                    target.votes = block.votes
+            self._publish()
+    
+    def finish_backfill(self) -> bool:
+        """Replay the backfilled history and check it reproduces the bootstrap snapshot"""
+        with self.lock:
+            snapshot = self._bootstrap_snapshot
+            history = self.chain[:snapshot["height"] + 1]
+            if any(block.votes is None for block in history):
+                return False
+        
+            tally, voters = {}, {}
+            for block in history:
+                for position, vote in enumerate(block.votes):
+                    candidate = vote.get("candidate")
+                    if candidate:
+                        tally[candidate] = tally.get(candidate, 0) + 1
+                    voters[vote.get("voter_id")] = [block.index, position]
+            matches = tally == snapshot["tally"] and voters == snapshot["voters"]
         
-        for block in self.chain[1:]:  # Skip genesis block
-            for vote in block.votes:
-                candidate = vote.get("candidate")
-                if candidate:
-                    vote_count[candidate] = vote_count.get(candidate, 0) + 1
+            if not matches:
+                # The bodies are bound to PoW-checked headers, so they win over the snapshot
+                print(f"Snapshot at height {snapshot['height']} does not match the chain history, rebuilding state")
+                oldest = self.mempool.oldest_arrival()
+                pending_votes = self.mempool.clear()
+                self.vote_count, self.voter_index = {}, {}
+                for block in self.chain:
+                    self._apply_block(block)
+                self._restore_pending(pending_votes, oldest)
         
-        return vote_count
+            self.backfill_height = 0
+            self._bootstrap_snapshot = None
+            self._publish()
+            if self.store is not None:
+                for block in self.chain:
+                    self.store.append(block.to_dict())
+                self.store.sync()
+            return matches
     
     def to_dict(self) -> List[Dict]:
-        """Export blockchain to dictionary"""
-        return [block.to_dict() for block in self.chain]
\ No newline at end of file
+        """Export blockchain to dictionary (up to the first block whose body is not yet backfilled)"""
+        return self.view.get_blocks()
\ No newline at end of file
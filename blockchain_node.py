@@ -1,19 +1,50 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import requests
+import json
 import threading
 import time
-from typing import Dict, List
-from block import Block
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 from blockchain import Blockchain
+from block_store import BlockStore
+from chain_sync import ChainSync
 from crypto_utils import CryptoUtils
+from gossip import Gossip, SeenCache
+from miner import ParallelMiner
+from peer_client import PeerClient
+from wire_format import (accepts_binary, accepts_ndjson, choose_encoding, compress, encode_blocks, encode_ndjson,
+                         BINARY_MIMETYPE, NDJSON_MIMETYPE)
+
+# Largest number of votes accepted in one /votes/batch request
+MAX_BATCH_VOTES = 1000
 
 class BlockchainNode:
    """Blockchain node that processes and validates votes (Consumer)"""
-   def __init__(self, port: int, node_id: str):
+   def __init__(self, port: int, node_id: str, mining_workers: int = 1, data_dir: str = None,
+                target_block_votes: int = 100, max_vote_wait: float = 2.0, sync_interval: float = 5.0,
+                url: str = None):
        self.app = Flask(__name__)
        CORS(self.app)
-       self.blockchain = Blockchain()
+       # With a data directory the node restarts from its local block log
+       self.blockchain = Blockchain(BlockStore(data_dir) if data_dir else None)
+       self.miner = ParallelMiner(mining_workers)
+       self.peer_client = PeerClient(node_id)
+       self.chain_sync = ChainSync(self.blockchain, self.peer_client, node_id)
+       # The address peers know us by, sent along with gossip so relayed votes are not echoed back
+       self.url = url or f"http://localhost:{port}"
+       # One long-lived sender per peer drains a bounded queue of outbound votes
+       self.gossip = Gossip(self.peer_client, node_id, self.url)
+       # Inventory requested or handled recently, so repeated announcements are ignored
+       self.seen = SeenCache()
+       self.sync_lock = threading.Lock()
+       self.sync_requested = threading.Event()
+       # Block production: mine once this many votes are pending, or once the oldest has waited this long
+       self.target_block_votes = target_block_votes
+       self.max_vote_wait = max_vote_wait
+       self.votes_arrived = threading.Event()
+       # Prepares the next block template while the current block is being mined
+       self.template_builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{node_id}-template")
+       self.sync_interval = sync_interval  # Periodic sync even when no peer announces anything
        self.port = port
        self.node_id = node_id
        self.peers = set()
@@ -37,32 +68,165 @@ class BlockchainNode:
                }), 400
            # Add vote to blockchain
            result = self.blockchain.add_vote(vote_to_process)
+           if result["success"]:
+               self.votes_arrived.set()
            # Broadcast to peers ONLY if this is original submission (not already a broadcast)
            if result["success"] and not is_broadcast:
                print(f"[{self.node_id}] Broadcasting vote to peers")
                self.broadcast_vote(vote_to_process)
            return jsonify(result)
-       @self.app.route('/chain', methods=['GET'])
-       def get_chain():
-           """Get full blockchain"""
+       @self.app.route('/votes/batch', methods=['POST'])
+       def submit_votes():
+           """Receive many signed votes in one request; reports a result for each vote"""
+           batch = request.get_json(silent=True) or {}
+           votes = batch.get('votes')
+           if not isinstance(votes, list):
+               return jsonify({
+                   "success": False,
+                   "message": "Expected a JSON object with a list of votes"
+               }), 400
+           if len(votes) > MAX_BATCH_VOTES:
+               return jsonify({
+                   "success": False,
+                   "message": f"Batch exceeds {MAX_BATCH_VOTES} votes"
+               }), 413
+           # Verify every signature up front, then admit the valid votes in one pass
+           valid = CryptoUtils.verify_signatures(votes)
+           signed = [vote for vote, ok in zip(votes, valid) if ok]
+           added = iter(self.blockchain.add_votes(signed))
+           results = []
+           for vote, ok in zip(votes, valid):
+               if ok:
+                   results.append(next(added))
+               else:
+                   results.append({
+                       "success": False,
+                       "message": "Invalid vote signature",
+                       "voter_id": vote.get("voter_id") if isinstance(vote, dict) else None
+                   })
+           accepted = [vote for vote, result in zip(votes, results) if result["success"]]
+           if accepted:
+               self.votes_arrived.set()
+           if accepted and not batch.get('_is_broadcast', False):
+               print(f"[{self.node_id}] Broadcasting {len(accepted)} votes to peers")
+               self.broadcast_votes(accepted)
+           elif accepted:
+               # Relay gossiped votes onward; peers that already have them decline at /inv
+               self.broadcast_votes(accepted, exclude=batch.get('_from'))
            return jsonify({
-               "chain": self.blockchain.to_dict(),
-               "length": len(self.blockchain.chain)
+               "success": True,
+               "accepted": len(accepted),
+               "rejected": len(votes) - len(accepted),
+               "results": results
            })
+       @self.app.route('/inv', methods=['POST'])
+       def receive_inventory():
+           """Take vote IDs and block hashes announced by a peer; reply with the votes we want"""
+           inventory = request.get_json(silent=True) or {}
+           want = [
+               voter_id for voter_id in inventory.get('votes', [])
+               if isinstance(voter_id, str) and voter_id not in self.blockchain.voter_index and self.seen.add(voter_id)
+           ]
+           for announced in inventory.get('blocks', []):
+               if not isinstance(announced, dict):
+                   continue
+               work = announced.get('work')
+               # Tips with more work than ours are pulled through headers-first sync rather than pushed
+               if (isinstance(work, int) and work > self.blockchain.view.work
+                       and self.seen.add(f"block:{announced.get('hash')}")):
+                   self.sync_requested.set()
+           return jsonify({"want": want})
+       @self.app.route('/chain', methods=['GET'])
+       def get_chain():
+           """Get full blockchain (streamed a block at a time for NDJSON clients)"""
+           if accepts_ndjson(request.headers.get('Accept')):
+               # The view is immutable, so it can be serialized lazily while the chain moves on;
+               # like /blocks it stops below the first body a snapshot bootstrap has not backfilled
+               return self.stream_blocks(self.blockchain.view.iter_blocks())
+           chain = self.blockchain.to_dict()
+           return self.blocks_response({"chain": chain, "length": len(chain)}, chain)
+       @self.app.route('/voter/<voter_id>', methods=['GET'])
+       def get_voter(voter_id):
+           """Look up whether a (hashed) voter ID has voted"""
+           status = self.blockchain.get_voter_status(voter_id)
+           if status is None:
+               return jsonify({"found": False, "voter_id": voter_id}), 404
+           return jsonify({"found": True, "voter_id": voter_id, **status})
+       @self.app.route('/proof/<voter_id>', methods=['GET'])
+       def get_proof(voter_id):
+           """Get Merkle inclusion proof for a voter's vote"""
+           proof = self.blockchain.get_vote_proof(voter_id)
+           if proof is None:
+               return jsonify({"found": False, "voter_id": voter_id}), 404
+           return jsonify({"found": True, **proof})
+       @self.app.route('/tip', methods=['GET'])
+       def get_tip():
+           """Get height and hash of the chain tip"""
+           return jsonify(self.blockchain.get_tip())
+       @self.app.route('/blocks', methods=['GET'])
+       def get_blocks():
+           """Get blocks with heights in [from, to) (to defaults to the tip)"""
+           start = max(0, request.args.get('from', 0, type=int))
+           end = request.args.get('to', None, type=int)
+           if accepts_ndjson(request.headers.get('Accept')):
+               return self.stream_blocks(self.blockchain.view.iter_blocks(start, end))
+           blocks = self.blockchain.get_blocks(start, end)
+           return self.blocks_response({"blocks": blocks, "from": start, "count": len(blocks)}, blocks)
+       @self.app.route('/headers', methods=['GET'])
+       def get_headers():
+           """Get block headers (no votes) with heights in [from, to)"""
+           start = max(0, request.args.get('from', 0, type=int))
+           end = request.args.get('to', None, type=int)
+           headers = self.blockchain.get_headers(start, end)
+           return self.blocks_response({"headers": headers, "from": start, "count": len(headers)})
+       @self.app.route('/snapshot', methods=['GET'])
+       def get_snapshot():
+           """Get the latest hash-committed tally/voter-set snapshot"""
+           snapshot = self.blockchain.view.latest_snapshot
+           if snapshot is None:
+               return jsonify({"error": "No snapshot yet"}), 404
+           return jsonify(snapshot)
        @self.app.route('/pending', methods=['GET'])
        def get_pending():
-           """Get pending votes"""
+           """Get pending votes, oldest first (`limit` caps how many are listed)"""
+           limit = request.args.get('limit', default=1000, type=int)
            return jsonify({
-               "pending_votes": self.blockchain.pending_votes,
-               "count": len(self.blockchain.pending_votes)
+               "pending_votes": self.blockchain.get_pending(limit),
+               "count": len(self.blockchain.mempool),
+               "capacity": self.blockchain.mempool.capacity
            })
        @self.app.route('/results', methods=['GET'])
        def get_results():
-           """Get voting results"""
+           """Get voting results
+
+           After a snapshot bootstrap the tally comes from the snapshot and is
+           provisional until the history below it is backfilled and replayed;
+           `snapshot_verified` stays false and `backfill_height` non-zero until then.
+           """
+           view = self.blockchain.view
            return jsonify({
-               "results": self.blockchain.get_vote_count(),
-               "total_blocks": len(self.blockchain.chain),
-               "is_valid": self.blockchain.is_chain_valid()
+               "results": dict(view.tally),
+               "total_blocks": view.length,
+               "is_valid": self.blockchain.is_chain_valid(),
+               "verified_height": self.blockchain.verified_height,
+               "backfill_height": view.backfill_height,
+               "snapshot_verified": not view.backfill_height
+           })
+       @self.app.route('/validate', methods=['GET'])
+       def validate_chain():
+           """Deep audit: revalidate the whole chain from genesis"""
+           is_valid = self.blockchain.is_chain_valid(deep=True)
+           return jsonify({
+               "is_valid": is_valid,
+               "verified_height": self.blockchain.verified_height,
+               "total_blocks": self.blockchain.view.length
+           })
+       @self.app.route('/mining', methods=['GET'])
+       def get_mining_stats():
+           """Get per-worker hash rate of the last mining run"""
+           return jsonify({
+               "workers": self.miner.workers,
+               "last_run": self.miner.last_stats
            })
        @self.app.route('/peers/add', methods=['POST'])
        def add_peer():
@@ -70,103 +234,154 @@ class BlockchainNode:
            peer_url = request.json.get('peer_url')
            if peer_url:
                self.peers.add(peer_url)
+               self.gossip.add_peer(peer_url)
                return jsonify({"message": f"Peer added: {peer_url}"})
            return jsonify({"error": "Invalid peer URL"}), 400
        @self.app.route('/peers', methods=['GET'])
        def get_peers():
            """Get all peers"""
-           return jsonify({"peers": list(self.peers)})
+           return jsonify({
+               "peers": list(self.peers),
+               "stats": self.peer_client.stats(),
+               "gossip": self.gossip.stats(),
+               "gossip_queue_depth": self.gossip.queue_depth()
+           })
        @self.app.route('/sync', methods=['POST'])
        def sync_chain():
            """Synchronize blockchain with peers"""
            self.consensus()
            return jsonify({
                "message": "Blockchain synchronized",
-               "length": len(self.blockchain.chain)
+               "length": self.blockchain.view.length
            })
+   def blocks_response(self, payload: Dict, blocks: List[Dict] = None) -> Response:
+       """Serve blocks as compact binary if the client accepts it (JSON otherwise), compressed when offered"""
+       if blocks is not None and accepts_binary(request.headers.get('Accept')):
+           body, mimetype = encode_blocks(blocks), BINARY_MIMETYPE
+       else:
+           body, mimetype = json.dumps(payload).encode(), 'application/json'
+       response = Response(body, mimetype=mimetype)
+       encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+       if encoding and len(body) >= 1024:
+           response.set_data(compress(body, encoding))
+           response.headers['Content-Encoding'] = encoding
+       response.headers['Vary'] = 'Accept, Accept-Encoding'
+       return response
+   def stream_blocks(self, blocks: Iterable[Dict]) -> Response:
+       """Serve blocks as chunked newline-delimited JSON without building the whole body"""
+       response = Response(encode_ndjson(blocks), mimetype=NDJSON_MIMETYPE)
+       response.headers['Vary'] = 'Accept, Accept-Encoding'
+       return response
    def broadcast_vote(self, vote: Dict):
-       """Broadcast vote to peer nodes (asynchronous)"""
-       def send_to_peer(peer_url, vote_data):
-           try:
-               # Mark as broadcast to prevent re-broadcasting
-               vote_data_copy = vote_data.copy()
-               vote_data_copy['_is_broadcast'] = True
-               requests.post(f"{peer_url}/vote", json=vote_data_copy, timeout=2)
-           except Exception as e:
-               print(f"[{self.node_id}] Failed to broadcast to {peer_url}: {e}")
-       # Send to peers in separate threads to avoid blocking
-       for peer in self.peers:
-           thread = threading.Thread(target=send_to_peer, args=(peer, vote), daemon=True)
-           thread.start()
+       """Queue a vote for gossip to every peer"""
+       self.gossip.broadcast([vote])
+   def broadcast_votes(self, votes: List[Dict], exclude: str = None):
+       """Queue a batch of votes for gossip to every peer except `exclude`"""
+       self.gossip.broadcast(votes, exclude)
+   def announce_tip(self):
+       """Announce our current tip to every peer"""
+       view = self.blockchain.view
+       self.gossip.announce_block(view.tip.hash, view.tip.index, view.work)
+   def sync_loop(self):
+       """Run consensus as soon as a peer announces a block we do not have, and every `sync_interval` seconds"""
+       while self.mining_active:
+           self.sync_requested.wait(self.sync_interval)
+           self.sync_requested.clear()
+           self.consensus()
+           if self.blockchain.store is not None:
+               self.blockchain.store.sync()  # fsync whatever the last batch left unsynced
    def consensus(self):
-       """Achieve consensus by adopting longest valid chain"""
-       longest_chain = None
-       max_length = len(self.blockchain.chain)
-       # SAVE pending votes and voter_ids before sync
-       saved_pending_votes = self.blockchain.pending_votes.copy()
-       saved_voter_ids = self.blockchain.voter_ids.copy()
-       for peer in self.peers:
+       """Achieve consensus by adopting the valid chain with the most work (headers first, then bodies)"""
+       with self.sync_lock:
+           if self.blockchain.view.length == 1 and self.peers:
+               # A fresh node starts from a peer snapshot and backfills older history in the background
+               bootstrap = self.chain_sync.bootstrap_from_snapshot(self.peers)
+               if bootstrap:
+                   self.miner.cancel()
+                   threading.Thread(target=self.backfill_loop, args=bootstrap, daemon=True).start()
+           return self._consensus()
+   def backfill_loop(self, headers: List[Dict], sources: List[str]):
+       """Backfill the history below a bootstrap snapshot, retrying with backoff until it has been replayed
+
+       Until then nothing is persisted and reorgs below the snapshot are refused,
+       so a failed download is retried against every current peer.
+       """
+       failures = 0
+       while self.mining_active:
+           self.chain_sync.backfill_history(headers, sources)
+           if not self.blockchain.view.backfill_height:
+               return  # Replayed (state is rebuilt from the bodies if the snapshot did not match)
+           failures += 1
+           delay = min(self.peer_client.max_backoff, self.peer_client.base_backoff * 2 ** (failures - 1))
+           print(f"[{self.node_id}] Retrying history backfill in {delay:.1f}s")
+           time.sleep(delay)
+           sources = sorted(self.peers)
+   def _consensus(self) -> bool:
+       result = self.chain_sync.sync(self.peers)
+       if result:
            try:
-               response = requests.get(f"{peer}/chain", timeout=5)
-               if response.status_code == 200:
-                   data = response.json()
-                   length = data['length']
-                   chain_data = data['chain']
-                   if length > max_length:
-                       # Validate chain before accepting
-                       temp_blockchain = Blockchain()
-                       temp_blockchain.chain = []
-                       # Rebuild voter_ids from the chain
-                       temp_blockchain.voter_ids = set()
-                       for block_data in chain_data:
-                           block = Block(
-                               index=block_data['index'],
-                               votes=block_data['votes'],
-                               previous_hash=block_data['previous_hash'],
-                               timestamp=block_data['timestamp']
-                           )
-                           block.nonce = block_data['nonce']
-                           block.hash = block_data['hash']
-                           temp_blockchain.chain.append(block)
-                           # Track voter IDs from this block
-                           for vote in block.votes:
-                               temp_blockchain.voter_ids.add(vote.get('voter_id'))
-                       if temp_blockchain.is_chain_valid():
-                           longest_chain = temp_blockchain
-                           max_length = length
-           except Exception as e:
-               print(f"[{self.node_id}] Consensus error with {peer}: {e}")
-       if longest_chain:
-           self.blockchain = longest_chain
-           # RESTORE pending votes that aren't already in the chain
-           self.blockchain.pending_votes = [
-               vote for vote in saved_pending_votes
-               if vote.get('voter_id') not in self.blockchain.voter_ids
-           ]
+               # Roll back / apply only the divergent blocks; tally and pending votes follow
+               removed, added = self.blockchain.replace_suffix(*result)
+           except ValueError as e:
+               # Our own miner may have extended the chain since the fork was chosen
+               print(f"[{self.node_id}] Reorg rejected: {e}")
+               return False
+           # Stop mining on the old tip (a search that has not started yet sees the new tip itself)
+           self.miner.cancel()
            print(
-               f"[{self.node_id}] Chain replaced with length {max_length}, pending votes: {len(self.blockchain.pending_votes)}")
+               f"[{self.node_id}] Chain replaced with length {self.blockchain.view.length} "
+               f"(-{len(removed)}/+{len(added)} blocks), pending votes: {len(self.blockchain.mempool)}")
+           self.announce_tip()
+           # Votes orphaned by the reorg are pending again
+           self.votes_arrived.set()
            return True
        return False
+   def block_due(self) -> Tuple[bool, Optional[float]]:
+       """(due, seconds to the oldest vote's deadline): due once the mempool reaches the target block size or that deadline passes"""
+       pending, oldest = self.blockchain.block_due_info()
+       if oldest is None:
+           return False, None
+       wait = max(0.0, oldest + self.max_vote_wait - time.time())
+       return pending >= self.target_block_votes or wait == 0.0, wait
    def auto_mine(self):
-       """Automatically mine blocks when pending votes exist"""
+       """Produce blocks when `block_due`, woken by vote arrival or the oldest vote's deadline
+
+       Mining is pipelined: while one block's proof of work runs, the next
+       template is built from the votes it does not include, and votes keep
+       flowing into the mempool; only the votes of a committed block leave it.
+       """
+       next_template = None
        while self.mining_active:
-           time.sleep(5)  # Check every 5 seconds
-           pending_count = len(self.blockchain.pending_votes)
-           print(f"[{self.node_id}] Auto-mine check: {pending_count} pending vote(s)")
-           if pending_count >= 1:  # Mine when 1+ votes pending
-               print(f"[{self.node_id}] Mining block with {pending_count} vote(s)...")
-               self.blockchain.mine_pending_votes(self.node_id)
-               time.sleep(1)  # Brief pause to allow propagation
-               # Sync with network after mining
-               print(f"[{self.node_id}] Syncing after mining...")
-               self.consensus()
-           else:
-               # Sync periodically even without mining
-               self.consensus()
+           try:
+               self.votes_arrived.clear()
+               due, deadline = self.block_due()
+               if not due:
+                   self.votes_arrived.wait(deadline)
+                   continue
+               block = self.blockchain.refresh_template(next_template.result() if next_template else None)
+               next_template = None
+               if block is None:
+                   continue
+               in_block = {vote.get("voter_id") for vote in block.votes}
+               next_template = self.template_builder.submit(self.blockchain.create_template, in_block)
+               print(f"[{self.node_id}] Mining block {block.index} with {len(block.votes)} of {len(self.blockchain.mempool)} pending vote(s)...")
+               # The search stops as soon as the tip it builds on is replaced
+               is_stale = lambda: self.blockchain.view.tip.hash != block.previous_hash
+               if block.mine_block(self.miner, is_stale) and self.blockchain.commit_block(block):
+                   print(f"Block {block.index} mined by {self.node_id}")
+                   rates = ", ".join(f"w{stat['worker']}={stat['hash_rate']:,.0f} H/s" for stat in self.miner.last_stats)
+                   print(f"[{self.node_id}] Hash rate per worker: {rates}")
+                   self.announce_tip()
+           except Exception as e:
+               # Keep the mining thread alive; the next round starts from a fresh template
+               print(f"[{self.node_id}] Mining round failed: {e}")
+               next_template = None
+               time.sleep(0.1)
    def run(self):
        """Start the node"""
        # Start auto-mining in background thread
        mining_thread = threading.Thread(target=self.auto_mine, daemon=True)
        mining_thread.start()
+       threading.Thread(target=self.sync_loop, daemon=True).start()
        print(f"Node {self.node_id} running on port {self.port}")
        self.app.run(host='0.0.0.0', port=self.port, debug=False)
\ No newline at end of file
@@ -0,0 +1,184 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from block import Block
+from blockchain import MAX_FUTURE_DRIFT, Blockchain
+from miner import block_work
+from peer_client import PeerClient
+from snapshot import verify_snapshot
+
+class ChainSync:
+    """Headers-first synchronization: pick the best peer chain from headers, then fetch bodies"""
+
+    def __init__(self, blockchain: Blockchain, peer_client: PeerClient, node_id: str,
+                 batch_size: int = 50, max_downloads: int = 8):
+        self.blockchain = blockchain
+        self.peer_client = peer_client
+        self.node_id = node_id
+        self.batch_size = batch_size
+        self.max_downloads = max_downloads
+
+    def probe_tips(self, peers) -> Dict[str, Dict]:
+        """Ask every peer for its tip concurrently"""
+        return self.peer_client.fan_out(peers, lambda peer: self.peer_client.get(peer, "/tip"))
+
+    def fetch_headers(self, peer: str, start: int, end: int = None) -> List[Dict]:
+        """Headers with heights in [start, end) from a peer"""
+        params = {"from": start} if end is None else {"from": start, "to": end}
+        return self.peer_client.get(peer, "/headers", params)['headers']
+
+    def find_fork_height(self, peer: str, peer_length: int) -> int:
+        """Height of the first block where the peer's chain differs from ours (header-only walk back)"""
+        blocks = self.blockchain.view.blocks
+        high = min(len(blocks), peer_length)
+        window = 16
+        while high > 0:
+            low = max(0, high - window)
+            for header in reversed(self.fetch_headers(peer, low, high)):
+                if header['hash'] == blocks[header['index']].hash:
+                    return header['index'] + 1
+            high = low
+            window *= 2
+        return 0
+
+    def validate_headers(self, fork_height: int, headers: List[Dict]) -> bool:
+        """Check hash linkage, indices, timestamps, declared difficulty and proof of work of a header chain"""
+        blocks = self.blockchain.view.blocks
+
+        def header_at(height: int) -> Tuple[float, int]:
+            # Below the fork the retarget window reads our own blocks, above it the peer's headers
+            if height < fork_height:
+                return blocks[height].timestamp, blocks[height].difficulty
+            header = headers[height - fork_height]
+            return header['timestamp'], header['difficulty']
+
+        if fork_height == 0:
+            # Every node starts from the same fixed genesis; a chain built on another one is foreign
+            if headers[0]['hash'] != blocks[0].hash:
+                print(f"[{self.node_id}] Peer chain has a different genesis block")
+                return False
+            previous_hash, previous_index, to_check = headers[0]['hash'], 0, headers[1:]
+        else:
+            previous = blocks[fork_height - 1]
+            previous_hash, previous_index, to_check = previous.hash, previous.index, headers
+        for header in to_check:
+            if header['index'] != previous_index + 1 or header['previous_hash'] != previous_hash:
+                print(f"[{self.node_id}] Broken header linkage at {header['index']}")
+                return False
+            if header['timestamp'] <= self.blockchain.median_time_past(header['index'], header_at):
+                print(f"[{self.node_id}] Header {header['index']} is not after the median time past")
+                return False
+            if header['timestamp'] > time.time() + MAX_FUTURE_DRIFT:
+                print(f"[{self.node_id}] Header {header['index']} is too far in the future")
+                return False
+            if header['difficulty'] != self.blockchain.difficulty_for(header['index'], header_at):
+                print(f"[{self.node_id}] Header {header['index']} declares the wrong difficulty")
+                return False
+            if not Block.verify_header(header):
+                print(f"[{self.node_id}] Invalid header hash or proof of work at {header['index']}")
+                return False
+            previous_hash, previous_index = header['hash'], header['index']
+        return True
+
+    def headers_work(self, headers: List[Dict]) -> int:
+        """Proof of work a run of headers carries"""
+        return sum(block_work(header['difficulty']) for header in headers)
+
+    def select_best_chain(self, tips: Dict[str, Dict]) -> Optional[Tuple[int, List[Dict], List[str]]]:
+        """Peer chain with the most cumulative work whose headers validate: (fork_height, headers, peers serving it)"""
+        view = self.blockchain.view
+        candidates = sorted(
+            (peer for peer, tip in tips.items() if tip.get('work', 0) > view.work),
+            key=lambda peer: tips[peer]['work'],
+            reverse=True
+        )
+        for peer in candidates:
+            try:
+                fork_height = self.find_fork_height(peer, tips[peer]['length'])
+                if view.backfill_height and fork_height <= view.backfill_height:
+                    continue  # Cannot roll back history we only hold headers for
+                headers = self.fetch_headers(peer, fork_height)
+                # Only the divergent suffixes are compared, from the common ancestor up
+                if (not headers or self.headers_work(headers) <= view.work_since(fork_height)
+                        or not self.validate_headers(fork_height, headers)):
+                    continue
+                # The chosen peer served these headers even if it mined past its probed tip since
+                sources = [peer] + [p for p in candidates if p != peer and tips[p]['hash'] == headers[-1]['hash']]
+                return fork_height, headers, sources
+            except Exception as e:
+                print(f"[{self.node_id}] Header sync error with {peer}: {e}")
+        return None
+
+    def _download_batch(self, headers: List[Dict], sources: List[str], first_source: int) -> List[Block]:
+        """Fetch the bodies for a run of headers, trying each source peer in turn"""
+        start, end = headers[0]['index'], headers[-1]['index'] + 1
+        for attempt in range(len(sources)):
+            peer = sources[(first_source + attempt) % len(sources)]
+            try:
+                block_list = self.peer_client.get_blocks(peer, "/blocks", {"from": start, "to": end}, timeout=10)
+                blocks = [Block.from_dict(block_data) for block_data in block_list]
+                # Each body must reproduce the hash of the header we already validated
+                if (len(blocks) == len(headers)
+                        and all(block.calculate_hash() == header['hash'] == block.hash
+                                for block, header in zip(blocks, headers))):
+                    return blocks
+                print(f"[{self.node_id}] Bodies {start}-{end - 1} from {peer} do not match headers")
+            except Exception as e:
+                print(f"[{self.node_id}] Body download {start}-{end - 1} failed from {peer}: {e}")
+        raise ValueError(f"No peer served valid bodies for blocks {start}-{end - 1}")
+
+    def download_bodies(self, headers: List[Dict], sources: List[str]) -> List[Block]:
+        """Download block bodies in parallel batches spread across the source peers"""
+        batches = [headers[i:i + self.batch_size] for i in range(0, len(headers), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=min(self.max_downloads, len(batches))) as executor:
+            results = executor.map(
+                lambda numbered: self._download_batch(numbered[1], sources, numbered[0]),
+                enumerate(batches)
+            )
+            return [block for batch in results for block in batch]
+
+    def sync(self, peers) -> Optional[Tuple[int, List[Block]]]:
+        """Find the best peer chain and return (fork_height, new blocks) to apply, if any"""
+        best = self.select_best_chain(self.probe_tips(peers))
+        if best is None:
+            return None
+        fork_height, headers, sources = best
+        try:
+            return fork_height, self.download_bodies(headers, sources)
+        except Exception as e:
+            print(f"[{self.node_id}] Sync aborted: {e}")
+            return None
+
+    def bootstrap_from_snapshot(self, peers) -> Optional[Tuple[List[Dict], List[str]]]:
+        """Adopt the newest valid peer snapshot; returns (headers, peers) to backfill history from"""
+        tips = self.probe_tips(peers)
+        for peer in sorted(tips, key=lambda peer: tips[peer]['length'], reverse=True):
+            try:
+                snapshot = self.peer_client.get(peer, "/snapshot")
+                if not verify_snapshot(snapshot):
+                    print(f"[{self.node_id}] Snapshot from {peer} does not match its commitment")
+                    continue
+                height = snapshot['height']
+                headers = self.fetch_headers(peer, 0, height + 1)
+                # The snapshot is only as trustworthy as the PoW header chain that ends in its tip
+                if (len(headers) != height + 1 or headers[-1]['hash'] != snapshot['tip_hash']
+                        or not self.validate_headers(0, headers)):
+                    print(f"[{self.node_id}] Snapshot from {peer} is not anchored in a valid header chain")
+                    continue
+                self.blockchain.install_snapshot(snapshot, headers)
+                sources = [p for p in tips if tips[p]['length'] > height]
+                return headers, sources
+            except Exception as e:
+                print(f"[{self.node_id}] Snapshot bootstrap from {peer} failed: {e}")
+        return None
+
+    def backfill_history(self, headers: List[Dict], sources: List[str]) -> bool:
+        """Download and verify the history below a bootstrap snapshot"""
+        try:
+            self.blockchain.fill_bodies(self.download_bodies(headers, sources))
+        except Exception as e:
+            print(f"[{self.node_id}] History backfill failed: {e}")
+            return False
+        matches = self.blockchain.finish_backfill()
+        print(f"[{self.node_id}] History backfilled to height {headers[-1]['index']}, snapshot verified: {matches}")
+        return matches
@@ -0,0 +1,57 @@
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from block import Block
+
+class ChainView(NamedTuple):
+    """Immutable snapshot of the chain, published by the writer after every block change
+
+    Readers grab `blockchain.view` once and work on it without locking;
+    the writer never mutates a published view, it swaps in a new one.
+    """
+    blocks: Tuple[Block, ...]
+    chain_work: Tuple[int, ...]  # Cumulative work up to and including each height
+    tally: Mapping[str, int]
+    latest_snapshot: Optional[Dict]
+    backfill_height: int
+
+    @classmethod
+    def capture(cls, chain: List[Block], chain_work: List[int], vote_count: Dict[str, int],
+                latest_snapshot: Optional[Dict], backfill_height: int) -> "ChainView":
+        """Copy the writer's mutable state into a new view"""
+        return cls(tuple(chain), tuple(chain_work), MappingProxyType(dict(vote_count)), latest_snapshot, backfill_height)
+
+    @property
+    def length(self) -> int:
+        return len(self.blocks)
+
+    @property
+    def tip(self) -> Block:
+        return self.blocks[-1]
+
+    @property
+    def work(self) -> int:
+        """Total proof of work behind the tip"""
+        return self.chain_work[-1]
+
+    def work_since(self, fork_height: int) -> int:
+        """Work of the blocks from `fork_height` to the tip"""
+        return self.work - (self.chain_work[fork_height - 1] if fork_height > 0 else 0)
+
+    def tip_info(self) -> Dict:
+        """Cheap probe of the chain tip"""
+        return {"height": self.tip.index, "hash": self.tip.hash, "length": len(self.blocks), "work": self.work}
+
+    def iter_blocks(self, start: int = 0, end: int = None) -> Iterator[Dict]:
+        """Blocks with heights in [start, end) one at a time, stopping at the first body not yet backfilled"""
+        for block in self.blocks[start:end]:
+            if block.votes is None:
+                return
+            yield block.to_dict()
+
+    def get_blocks(self, start: int = 0, end: int = None) -> List[Dict]:
+        """Blocks with heights in [start, end), stopping at the first body not yet backfilled"""
+        return list(self.iter_blocks(start, end))
+
+    def get_headers(self, start: int = 0, end: int = None) -> List[Dict]:
+        """Headers (without votes) with heights in [start, end)"""
+        return [block.header_dict() for block in self.blocks[start:end]]
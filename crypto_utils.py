@@ -1,6 +1,6 @@
 import hashlib
 import json
-from typing import Dict
+from typing import Dict, List
 
 class CryptoUtils:
     """Cryptographic utilities for voting system"""
@@ -23,3 +23,8 @@ class CryptoUtils:
         vote_copy = {k: v for k, v in vote.items() if k != "signature"}
         expected_signature = CryptoUtils.sign_vote(vote_copy)
         return signature == expected_signature
+    
+    @staticmethod
+    def verify_signatures(votes: List[Dict]) -> List[bool]:
+        """Verify a batch of vote signatures; non-dict entries count as invalid"""
+        return [isinstance(vote, dict) and CryptoUtils.verify_signature(vote) for vote in votes]
@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List
+from peer_client import PeerClient
+
+class SeenCache:
+    """Bounded LRU of recently seen inventory (vote IDs, block hashes) with an expiry
+
+    An entry only suppresses duplicates for `ttl` seconds, so an item that
+    was requested but never delivered can be requested again from the next
+    peer that announces it.
+    """
+
+    def __init__(self, capacity: int = 50000, ttl: float = 30.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str) -> bool:
+        """Record `key`; True if it was not seen within the last `ttl` seconds"""
+        now = time.time()
+        with self._lock:
+            seen_at = self._entries.get(key)
+            if seen_at is not None and now - seen_at < self.ttl:
+                self._entries.move_to_end(key)
+                return False
+            self._entries[key] = now
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            return True
+
+class PeerGossipQueue:
+    """Bounded outbound inventory queue for one peer, drained by a single long-lived sender thread
+
+    Each round announces the queued vote IDs and block hashes with one
+    `/inv` request; the peer answers with the vote IDs it does not have, and
+    only those payloads are sent on to `/votes/batch`. Block bodies are not
+    pushed: a peer that lacks an announced block pulls it through chain sync.
+    Anything queued while a round is in flight is coalesced into the next
+    round. A failed announcement goes back to the head of the queue; a
+    failed delivery is retried on its own, since the peer already marked
+    those IDs as requested and would not ask for them again. Both retry
+    with exponential backoff; when the queue is full the oldest votes are
+    dropped (chain sync still delivers them once mined).
+    """
+
+    def __init__(self, peer: str, peer_client: PeerClient, node_id: str, origin: str = None, max_queue: int = 10000,
+                 max_batch: int = 500, max_blocks: int = 16, base_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.peer = peer
+        self.peer_client = peer_client
+        self.node_id = node_id
+        self.origin = origin  # Our own URL, so the peer does not relay our votes straight back
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.max_blocks = max_blocks
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.announced = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failures = 0
+        self._queue = deque()
+        self._undelivered: List[Dict] = []  # Votes the peer asked for whose delivery failed
+        self._blocks = deque(maxlen=max_blocks)
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"{node_id}-gossip-{peer}")
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return len(self._queue) + len(self._undelivered)
+
+    def _trim(self):
+        """Drop the oldest votes beyond capacity (caller holds the condition)"""
+        while len(self._queue) > self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+
+    def enqueue(self, votes: Iterable[Dict]):
+        """Queue votes for this peer without blocking the caller"""
+        with self._condition:
+            self._queue.extend(votes)
+            self._trim()
+            self._condition.notify()
+
+    def announce_block(self, block_hash: str, height: int, work: int):
+        """Queue a block announcement; only the newest `max_blocks` are kept"""
+        with self._condition:
+            self._blocks.append({"hash": block_hash, "height": height, "work": work})
+            self._condition.notify()
+
+    def _take_round(self):
+        """Wait for queued inventory and remove up to `max_batch` votes plus every block announcement"""
+        with self._condition:
+            while not self._queue and not self._blocks and not self._stopped:
+                self._condition.wait()
+            if self._stopped:
+                return None
+            votes = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            blocks = list(self._blocks)
+            self._blocks.clear()
+            return votes, blocks
+
+    def _announce(self, votes: List[Dict], blocks: List[Dict]) -> List[Dict]:
+        """Announce inventory; returns the votes the peer asked for"""
+        inventory = {"votes": [vote["voter_id"] for vote in votes], "blocks": blocks}
+        want = set(self.peer_client.post(self.peer, "/inv", inventory).get("want", []))
+        self.announced += len(votes)
+        return [vote for vote in votes if vote["voter_id"] in want]
+
+    def _deliver(self, votes: List[Dict]):
+        """Push the requested votes"""
+        if votes:
+            self.peer_client.post(self.peer, "/votes/batch", {"votes": votes, "_is_broadcast": True, "_from": self.origin})
+            self.sent += len(votes)
+
+    def _back_off(self, consecutive_failures: int, error: Exception):
+        """Sleep out the backoff after a failure, but wake immediately on stop()"""
+        self.failures += 1
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (consecutive_failures - 1))
+        print(f"[{self.node_id}] Gossip to {self.peer} failed, retrying in {delay:.1f}s: {error}")
+        with self._condition:
+            self._condition.wait_for(lambda: self._stopped, timeout=delay)
+
+    def _run(self):
+        consecutive_failures = 0
+        while not self._stopped:
+            if self._undelivered:
+                try:
+                    self._deliver(self._undelivered)
+                    self._undelivered = []
+                    consecutive_failures = 0
+                except Exception as e:
+                    consecutive_failures += 1
+                    self._back_off(consecutive_failures, e)
+                continue
+            batch = self._take_round()
+            if batch is None:
+                return
+            votes, blocks = batch
+            try:
+                wanted = self._announce(votes, blocks)
+            except Exception as e:
+                with self._condition:
+                    self._queue.extendleft(reversed(votes))
+                    self._trim()
+                    # Newer announcements made during the failed round take precedence
+                    pending_blocks = list(self._blocks)
+                    self._blocks.clear()
+                    self._blocks.extend(blocks + pending_blocks)
+                consecutive_failures += 1
+                self._back_off(consecutive_failures, e)
+                continue
+            try:
+                self._deliver(wanted)
+                consecutive_failures = 0
+            except Exception as e:
+                self._undelivered = wanted
+                consecutive_failures += 1
+                self._back_off(consecutive_failures, e)
+
+    def stats(self) -> Dict:
+        """Queue depth and delivery counters"""
+        with self._condition:
+            return {
+                "queued": len(self._queue) + len(self._undelivered),
+                "announced": self.announced,
+                "sent": self.sent,
+                "suppressed": self.announced - self.sent - len(self._undelivered),
+                "dropped": self.dropped,
+                "failures": self.failures
+            }
+
+    def stop(self):
+        """Stop the sender thread; queued inventory is discarded"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+class Gossip:
+    """Outbound inventory gossip: one queue and sender thread per peer, regardless of vote rate"""
+
+    def __init__(self, peer_client: PeerClient, node_id: str, origin: str = None, **queue_options):
+        self.peer_client = peer_client
+        self.node_id = node_id
+        self.origin = origin
+        self.queue_options = queue_options
+        self._queues: Dict[str, PeerGossipQueue] = {}
+        self._lock = threading.Lock()
+
+    def add_peer(self, peer: str):
+        """Start a sender for a newly added peer"""
+        with self._lock:
+            if peer not in self._queues:
+                self._queues[peer] = PeerGossipQueue(peer, self.peer_client, self.node_id, self.origin,
+                                                     **self.queue_options)
+
+    def _peer_queues(self) -> List[PeerGossipQueue]:
+        with self._lock:
+            return list(self._queues.values())
+
+    def broadcast(self, votes: List[Dict], exclude: str = None):
+        """Queue votes for announcement to every peer but `exclude` (the peer that relayed them to us)"""
+        for peer_queue in self._peer_queues():
+            if peer_queue.peer != exclude:
+                peer_queue.enqueue(votes)
+
+    def announce_block(self, block_hash: str, height: int, work: int):
+        """Announce a new tip and its cumulative work to every peer right away"""
+        for peer_queue in self._peer_queues():
+            peer_queue.announce_block(block_hash, height, work)
+
+    def queue_depth(self) -> int:
+        """Votes waiting to be announced, summed over peers"""
+        return sum(len(peer_queue) for peer_queue in self._peer_queues())
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-peer queue depth and delivery counters"""
+        with self._lock:
+            return {peer: peer_queue.stats() for peer, peer_queue in self._queues.items()}
+
+    def stop(self):
+        """Stop every sender thread"""
+        for peer_queue in self._peer_queues():
+            peer_queue.stop()
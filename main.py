@@ -2,12 +2,22 @@ import sys
 import threading
 import time
 
-def run_node(port, node_id):
+def run_node(port, node_id, mining_workers=1, data_dir=None):
     """Run a blockchain node"""
     from blockchain_node import BlockchainNode
-    node = BlockchainNode(port, node_id)
+    node = BlockchainNode(port, node_id, mining_workers, data_dir)
     node.run()
 
+def run_auditor(node_urls):
+    """Run the continuous auditor until interrupted"""
+    from streaming_auditor import StreamingAuditor
+    auditor = StreamingAuditor(node_urls)
+    try:
+        auditor.run()
+    except KeyboardInterrupt:
+        print(f"\nAudit status: {auditor.status()}")
+        auditor.stop()
+
 def simulate_voting():
     """Simulate voting process"""
     time.sleep(3)  # Wait for nodes to start
@@ -65,7 +75,12 @@ if __name__ == "__main__":
         # Run single node
         port = int(sys.argv[2]) if len(sys.argv) > 2 else 5001
         node_id = sys.argv[3] if len(sys.argv) > 3 else f"node_{port}"
-        run_node(port, node_id)
+        mining_workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1  # 0 = all cores
+        data_dir = sys.argv[5] if len(sys.argv) > 5 else None  # persist blocks here
+        run_node(port, node_id, mining_workers, data_dir)
+    elif len(sys.argv) > 1 and sys.argv[1] == "audit":
+        # Continuously audit the given nodes
+        run_auditor(sys.argv[2:] or ["http://localhost:5001", "http://localhost:5002", "http://localhost:5003"])
     else:
         # Run full simulation
         print("Starting Distributed Voting System...")
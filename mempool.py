@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+class Mempool:
+    """Pending votes keyed by voter_id, kept in arrival order
+
+    Insert, lookup and removal are O(1). When `capacity` is reached the
+    policy decides what happens to a new vote: "reject" turns it away,
+    "evict-oldest" drops the longest-waiting vote to make room.
+    """
+
+    POLICIES = ("reject", "evict-oldest")
+
+    def __init__(self, capacity: int = 100000, policy: str = "reject"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown mempool policy {policy!r}, expected one of {self.POLICIES}")
+        self.capacity = capacity
+        self.policy = policy
+        self._votes: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()  # voter_id -> (vote, arrival)
+
+    def __len__(self) -> int:
+        return len(self._votes)
+
+    def __contains__(self, voter_id: str) -> bool:
+        return voter_id in self._votes
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Votes in arrival order"""
+        return (vote for vote, _ in list(self._votes.values()))
+
+    def is_full(self) -> bool:
+        return len(self._votes) >= self.capacity
+
+    def add(self, vote: Dict) -> Tuple[bool, List[Dict]]:
+        """Insert a vote at the back; returns (accepted, votes evicted to make room)"""
+        evicted = []
+        while self.is_full():
+            if self.policy == "reject" or not self._votes:
+                return False, evicted
+            evicted.append(self._votes.popitem(last=False)[1][0])
+        self._votes[vote.get("voter_id")] = (vote, time.time())
+        return True, evicted
+
+    def requeue(self, votes: List[Dict], arrival: float = None):
+        """Put votes back at the front (orphaned by a reorg, so older than anything queued)
+
+        They are stamped with `arrival`, or else with the oldest queued arrival
+        time, so that oldest_arrival() (and the block deadline built on it)
+        is not pushed back by votes that were already waiting.
+        """
+        if arrival is None:
+            oldest = self.oldest_arrival()
+            arrival = time.time() if oldest is None else oldest
+        for vote in reversed(votes):
+            self._votes[vote.get("voter_id")] = (vote, arrival)
+            self._votes.move_to_end(vote.get("voter_id"), last=False)
+
+    def remove_many(self, voter_ids: Iterable[str]) -> int:
+        """Drop every listed vote that is pending, e.g. the votes of a newly connected block"""
+        removed = 0
+        for voter_id in voter_ids:
+            if self._votes.pop(voter_id, None) is not None:
+                removed += 1
+        return removed
+
+    def select_template(self, max_votes: int, exclude: Set[str] = frozenset()) -> List[Dict]:
+        """Oldest-first selection of up to `max_votes` votes for the next block, skipping `exclude`"""
+        template = []
+        for voter_id, (vote, _) in self._votes.items():
+            if len(template) >= max_votes:
+                break
+            if voter_id not in exclude:
+                template.append(vote)
+        return template
+
+    def oldest_arrival(self) -> Optional[float]:
+        """Arrival time of the longest-waiting vote"""
+        if not self._votes:
+            return None
+        return next(iter(self._votes.values()))[1]
+
+    def clear(self) -> List[Dict]:
+        """Empty the pool, returning what it held"""
+        votes = list(self)
+        self._votes.clear()
+        return votes
@@ -0,0 +1,55 @@
+import hashlib
+import json
+from typing import Dict, List
+
+# Root committed to by blocks without votes (e.g. genesis)
+EMPTY_ROOT = "0" * 64
+
+def hash_vote(vote: Dict) -> str:
+    """Leaf hash of a vote (domain-separated from interior nodes)"""
+    vote_string = json.dumps(vote, sort_keys=True)
+    return hashlib.sha256(b"\x00" + vote_string.encode()).hexdigest()
+
+def hash_pair(left: str, right: str) -> str:
+    """Interior node hash of two child hashes"""
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+def build_levels(leaves: List[str]) -> List[List[str]]:
+    """Build every level of the tree, leaves first; an unpaired node is promoted unchanged"""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+def merkle_root(votes: List[Dict]) -> str:
+    """Merkle root of a list of votes"""
+    if not votes:
+        return EMPTY_ROOT
+    return build_levels([hash_vote(vote) for vote in votes])[-1][0]
+
+def merkle_proof(levels: List[List[str]], position: int) -> List[Dict]:
+    """Sibling path from leaf `position` up to the root"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append({
+                "hash": level[sibling],
+                "side": "left" if sibling < position else "right"
+            })
+        position //= 2
+    return proof
+
+def verify_merkle_proof(leaf_hash: str, proof: List[Dict], root: str) -> bool:
+    """Fold a sibling path onto a leaf hash and compare with the expected root"""
+    current = leaf_hash
+    for step in proof:
+        if step["side"] == "left":
+            current = hash_pair(step["hash"], current)
+        else:
+            current = hash_pair(current, step["hash"])
+    return current == root
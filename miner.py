@@ -0,0 +1,161 @@
+import hashlib
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Worker processes are started from nodes and auditors that already run Flask, gossip and sync threads.
+# A forked child could inherit a lock one of them holds and deadlock, so workers come from a clean
+# single-threaded fork server, or from fresh interpreters where the platform has none.
+PROCESS_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+def difficulty_target(difficulty: int) -> int:
+    """Numeric upper bound a digest must stay below to have `difficulty` leading zero bits"""
+    return 1 << (256 - difficulty)
+
+def block_work(difficulty: int) -> int:
+    """Expected number of hashes needed to meet `difficulty` (fork choice sums this over a chain)"""
+    return (1 << 256) // difficulty_target(difficulty)
+
+def mine_header(header: bytes, difficulty: int, start_nonce: int = 0,
+                max_attempts: Optional[int] = None) -> Tuple[Optional[int], Optional[str], int]:
+    """Search nonces for a header using a pre-hashed SHA-256 midstate
+
+    The header is absorbed into the hash state once; every attempt only copies
+    that state and feeds the decimal nonce suffix. Returns (nonce, hash, attempts),
+    with nonce and hash set to None if max_attempts ran out without a solution.
+    """
+    midstate = hashlib.sha256(header)
+    target = difficulty_target(difficulty)
+    end_nonce = start_nonce + (max_attempts if max_attempts is not None else 2 ** 63)
+
+    for nonce in range(start_nonce, end_nonce):
+        attempt = midstate.copy()
+        attempt.update(b"%d" % nonce)
+        if int.from_bytes(attempt.digest(), "big") < target:
+            return nonce, attempt.hexdigest(), nonce - start_nonce + 1
+
+    return None, None, end_nonce - start_nonce
+
+def _mine_worker(header: bytes, difficulty: int, start_nonce: int, worker_id: int, workers: int,
+                 chunk_size: int, stop_event, results):
+    """Search this worker's share of nonce chunks until a solution is found or stop is signalled"""
+    started = time.perf_counter()
+    attempts = 0
+    nonce = block_hash = None
+    chunk_start = start_nonce + worker_id * chunk_size
+
+    while not stop_event.is_set():
+        nonce, block_hash, tried = mine_header(header, difficulty, chunk_start, chunk_size)
+        attempts += tried
+        if nonce is not None:
+            stop_event.set()
+            break
+        chunk_start += workers * chunk_size
+
+    results.put((worker_id, nonce, block_hash, attempts, time.perf_counter() - started))
+
+class _SearchStop:
+    """Stop signal of one search: an explicit cancel, or the caller's check that the work went stale"""
+
+    def __init__(self, is_stale: Optional[Callable[[], bool]] = None):
+        self._event = threading.Event()
+        self._is_stale = is_stale
+
+    def set(self):
+        self._event.set()
+
+    def is_set(self) -> bool:
+        if not self._event.is_set() and self._is_stale is not None and self._is_stale():
+            self._event.set()
+        return self._event.is_set()
+
+class ParallelMiner:
+    """Proof-of-Work miner that partitions the nonce space across worker processes"""
+    
+    def __init__(self, workers: int = 1, chunk_size: int = 20000):
+        self.workers = max(1, workers or multiprocessing.cpu_count())
+        self.chunk_size = chunk_size
+        self.last_stats: List[Dict] = []
+        self._job: Optional[_SearchStop] = None
+        self._job_lock = threading.Lock()
+    
+    def cancel(self):
+        """Abort the search currently in progress, if any (a later search is not affected)"""
+        job = self._job
+        if job is not None:
+            job.set()
+    
+    def mine(self, header: bytes, difficulty: int, start_nonce: int = 0,
+             is_stale: Callable[[], bool] = None) -> Tuple[Optional[int], Optional[str]]:
+        """Find a nonce for the header, or return (None, None) if cancelled
+        
+        `is_stale` is polled between nonce chunks; once it returns True the
+        search stops, so work that went stale before it even started (e.g. the
+        tip moved) is never run to completion.
+        """
+        with self._job_lock:
+            job = self._job = _SearchStop(is_stale)
+            try:
+                if job.is_set():
+                    reports = []
+                elif self.workers == 1:
+                    reports = self._mine_inline(header, difficulty, start_nonce, job)
+                else:
+                    reports = self._mine_processes(header, difficulty, start_nonce, job)
+            finally:
+                self._job = None
+        
+        self.last_stats = [{
+            "worker": worker_id,
+            "attempts": attempts,
+            "hash_rate": attempts / elapsed if elapsed > 0 else 0.0
+        } for worker_id, _, _, attempts, elapsed in sorted(reports)]
+        
+        for _, nonce, block_hash, _, _ in reports:
+            if nonce is not None:
+                return nonce, block_hash
+        return None, None
+    
+    def _mine_inline(self, header: bytes, difficulty: int, start_nonce: int, job: _SearchStop) -> List[Tuple]:
+        """Single-worker search in the calling thread, checking for cancellation between chunks"""
+        results = queue.Queue()
+        _mine_worker(header, difficulty, start_nonce, 0, 1, self.chunk_size, job, results)
+        return [results.get()]
+    
+    def _mine_processes(self, header: bytes, difficulty: int, start_nonce: int, job: _SearchStop) -> List[Tuple]:
+        """Fan the search out to worker processes and wait for a solution or cancellation"""
+        stop_event = PROCESS_CONTEXT.Event()
+        results = PROCESS_CONTEXT.Queue()
+        processes = [
+            PROCESS_CONTEXT.Process(
+                target=_mine_worker,
+                args=(header, difficulty, start_nonce, worker_id, self.workers,
+                      self.chunk_size, stop_event, results),
+                daemon=True
+            )
+            for worker_id in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        
+        reports = []
+        while len(reports) < self.workers:
+            if job.is_set():
+                stop_event.set()
+            try:
+                reports.append(results.get(timeout=0.05))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    break
+                continue
+            if reports[-1][1] is not None:
+                stop_event.set()
+        
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        return reports
@@ -0,0 +1,98 @@
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, Iterable, List
+from wire_format import BLOCKS_ACCEPT, read_blocks
+
+class PeerClient:
+    """Pooled HTTP access to peer nodes with latency tracking and failure backoff"""
+
+    def __init__(self, node_id: str, max_workers: int = 16, base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.node_id = node_id
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{node_id}-peer")
+        self._sessions: Dict[str, requests.Session] = {}
+        self._health: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, peer: str) -> requests.Session:
+        """Keep-alive session dedicated to one peer"""
+        with self._lock:
+            session = self._sessions.get(peer)
+            if session is None:
+                session = requests.Session()
+                session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+                session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+                self._sessions[peer] = session
+                self._health[peer] = {"latency": None, "failures": 0, "retry_at": 0.0}
+            return session
+
+    def is_available(self, peer: str) -> bool:
+        """False while a failing peer is in its backoff window"""
+        health = self._health.get(peer)
+        return health is None or time.time() >= health["retry_at"]
+
+    def _record(self, peer: str, elapsed: float = None):
+        """Update latency average on success, or extend the backoff on failure"""
+        with self._lock:
+            health = self._health[peer]
+            if elapsed is not None:
+                previous = health["latency"]
+                health["latency"] = elapsed if previous is None else 0.7 * previous + 0.3 * elapsed
+                health["failures"] = 0
+                health["retry_at"] = 0.0
+            else:
+                health["failures"] += 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (health["failures"] - 1))
+                health["retry_at"] = time.time() + delay
+
+    def request(self, method: str, peer: str, path: str, timeout: float = 5, **kwargs) -> requests.Response:
+        """Send one request over the peer's session, raising on transport or HTTP errors"""
+        if not self.is_available(peer):
+            raise ConnectionError(f"{peer} is backing off after repeated failures")
+        session = self._session(peer)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, f"{peer}{path}", timeout=timeout, **kwargs)
+        except Exception:
+            self._record(peer)
+            raise
+        if response.status_code >= 500:
+            self._record(peer)
+        else:
+            # A 4xx answer still means the peer is up; only the request was refused
+            self._record(peer, time.perf_counter() - started)
+        response.raise_for_status()
+        return response
+
+    def get(self, peer: str, path: str, params: Dict = None, timeout: float = 5) -> Dict:
+        """GET a JSON document from a peer"""
+        return self.request("GET", peer, path, timeout, params=params).json()
+
+    def get_blocks(self, peer: str, path: str, params: Dict = None, timeout: float = 5) -> List[Dict]:
+        """GET blocks from a peer, preferring the compact binary format"""
+        response = self.request("GET", peer, path, timeout, params=params, headers={"Accept": BLOCKS_ACCEPT})
+        return read_blocks(response)
+
+    def post(self, peer: str, path: str, json: Dict = None, timeout: float = 5) -> Dict:
+        """POST a JSON document to a peer"""
+        return self.request("POST", peer, path, timeout, json=json).json()
+
+    def fan_out(self, peers: Iterable[str], call: Callable[[str], object]) -> Dict[str, object]:
+        """Run `call(peer)` for every available peer concurrently; returns results of the ones that succeeded"""
+        futures = {peer: self.executor.submit(call, peer) for peer in list(peers) if self.is_available(peer)}
+        results = {}
+        for peer, future in futures.items():
+            try:
+                results[peer] = future.result()
+            except Exception as e:
+                print(f"[{self.node_id}] Request to {peer} failed: {e}")
+        return results
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-peer latency (EWMA seconds), consecutive failures and backoff deadline"""
+        with self._lock:
+            return {peer: dict(health) for peer, health in self._health.items()}
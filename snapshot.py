@@ -0,0 +1,28 @@
+import hashlib
+import json
+from typing import Dict
+
+def snapshot_commitment(snapshot: Dict) -> str:
+    """SHA-256 over the canonical serialization of everything but the commitment itself"""
+    payload = {k: v for k, v in snapshot.items() if k != "commitment"}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def build_snapshot(height: int, tip_hash: str, tally: Dict[str, int], voter_index: Dict[str, Dict]) -> Dict:
+    """Hash-committed state at a checkpoint height: tally, confirmed voter set and tip hash"""
+    snapshot = {
+        "height": height,
+        "tip_hash": tip_hash,
+        "tally": dict(tally),
+        # voter_id -> [block height, position], confirmed votes only
+        "voters": {
+            voter_id: [entry["block"], entry["position"]]
+            for voter_id, entry in voter_index.items()
+            if entry["status"] == "confirmed"
+        }
+    }
+    snapshot["commitment"] = snapshot_commitment(snapshot)
+    return snapshot
+
+def verify_snapshot(snapshot: Dict) -> bool:
+    """Check that a snapshot's contents match its commitment"""
+    return snapshot.get("commitment") == snapshot_commitment(snapshot)
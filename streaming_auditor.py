@@ -0,0 +1,323 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from audit_engine import AuditEngine
+from blockchain import MEDIAN_TIME_BLOCKS
+from miner import block_work
+from peer_client import PeerClient
+
+class StreamingAuditor:
+    """Long-running auditor that verifies every block once and raises alerts as nodes advance
+
+    Each node has a cursor: the last block the auditor verified on it. A
+    poll asks every node for its tip and, when it moved, only for the
+    headers above the cursor; bodies are downloaded and verified only for
+    hashes no node has delivered before. A running tally and double-vote
+    index follow the verified chain with the most work, so the cost of a
+    poll grows with the new blocks, not with the chain.
+
+    Alert types: "fork" (a node rolled back blocks it had served),
+    "tampering" (a block fails verification), "divergence" (a node stays
+    off the most-work chain), "stalled" (a node is unreachable or stops
+    advancing while behind) and "double_vote".
+    """
+
+    def __init__(self, node_urls: List[str], interval: float = 2.0, stall_timeout: float = 30.0,
+                 divergence_timeout: float = 10.0, batch_size: int = 1000, workers: int = 0,
+                 max_alerts: int = 1000, on_alert: Optional[Callable[[Dict], None]] = None):
+        self.node_urls = list(node_urls)
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self.divergence_timeout = divergence_timeout
+        self.batch_size = batch_size
+        self.on_alert = on_alert
+        self.engine = AuditEngine(workers)
+        self.peer_client = PeerClient("auditor")
+        self.alerts = deque(maxlen=max_alerts)
+        self.rejected: Dict[str, List[str]] = {}  # Hash -> errors of blocks that failed verification
+
+        genesis = self.engine.rules.view.blocks[0]
+        # Header, cumulative work and (voter_id, candidate) pairs of every verified block, by hash
+        self.blocks: Dict[str, Dict] = {
+            genesis.hash: {"header": genesis.header_dict(), "work": block_work(genesis.difficulty), "votes": []}
+        }
+        self.chain: List[str] = [genesis.hash]  # Hashes of the most-work verified chain
+        self.voter_index: Dict[str, int] = {}  # voter_id -> height of the vote on that chain
+        self.tally: Dict[str, int] = {}
+        now = time.time()
+        self.cursors = {node_url: {
+            "height": 0,
+            "hash": genesis.hash,
+            "reachable": False,
+            "progress_at": now,
+            "behind_since": None,  # When the node was last seen falling behind or becoming unreachable
+            "stalled": False,
+            "diverged_since": None,
+            "divergence_reported": False,
+            "rejected": None  # Hash of the last failed block this node was reported for
+        } for node_url in self.node_urls}
+
+        self._round_alerts: List[Dict] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _alert(self, kind: str, node_url: str, message: str, **details) -> Dict:
+        alert = {"time": time.time(), "type": kind, "node": node_url, "message": message, **details}
+        self.alerts.append(alert)
+        self._round_alerts.append(alert)
+        print(f"[auditor] {kind.upper()} {node_url}: {message}")
+        if self.on_alert:
+            self.on_alert(alert)
+        return alert
+
+    def _fetch_new_headers(self, node_url: str) -> Tuple[Dict, List[Dict]]:
+        """A node's tip and its headers above the highest block of its chain the auditor already knows
+
+        Starts right above the cursor and, if the node no longer builds on a
+        verified block there (it reorganized), steps back in doubling windows.
+        """
+        cursor = self.cursors[node_url]
+        tip = self.peer_client.get(node_url, "/tip")
+        if tip['hash'] == cursor['hash']:
+            return tip, []
+        if tip['height'] > cursor['height']:
+            start = cursor['height'] + 1
+        else:
+            # A competing block at or below the cursor: its own header is the first one to compare
+            start = max(1, tip['height'])
+        window = 16
+        while True:
+            headers = self.peer_client.get(node_url, "/headers", {"from": start})['headers']
+            if not headers or headers[0]['previous_hash'] in self.blocks or start == 1:
+                return tip, headers
+            start = max(1, start - window)
+            window *= 2
+
+    def _parent(self, summary: Dict) -> Optional[Dict]:
+        return self.blocks.get(summary['header']['previous_hash'])
+
+    def _check_fork(self, node_url: str, headers: List[Dict]):
+        """Alert if the node's chain no longer contains blocks it served before"""
+        cursor = self.cursors[node_url]
+        current = {header['index']: header['hash'] for header in headers}
+        served = self.blocks.get(cursor['hash'])
+        # Where the new headers overlap what the node served, compare them directly
+        while served is not None and served['header']['index'] >= headers[0]['index']:
+            if current.get(served['header']['index']) == served['header']['hash']:
+                break
+            served = self._parent(served)
+        else:
+            # Below them both chains consist of verified blocks: walk back to the common ancestor
+            ancestor = self.blocks.get(headers[0]['previous_hash'])
+            while served is not None and ancestor is not None and served['header']['hash'] != ancestor['header']['hash']:
+                if served['header']['index'] >= ancestor['header']['index']:
+                    served = self._parent(served)
+                else:
+                    ancestor = self._parent(ancestor)
+        if served is None:
+            return  # Not built on our genesis; verification reports it
+        fork_height = served['header']['index'] + 1
+        if fork_height <= cursor['height']:
+            depth = cursor['height'] - fork_height + 1
+            self._alert("fork", node_url, f"Reorganized {depth} block(s) from height {fork_height}",
+                        height=fork_height, depth=depth)
+
+    def _expected_rules(self, previous_hash: str, blocks: List[Dict]) -> Tuple[List[int], List[float]]:
+        """Scheduled difficulty and median time past of each new block, reading earlier ones from verified ancestors"""
+        rules = self.engine.rules
+        first = blocks[0]['index']
+        by_height = {block['index']: block for block in blocks}
+        summary = self.blocks.get(previous_hash)
+        while summary is not None and summary['header']['index'] >= first - max(rules.retarget_interval + 1,
+                                                                                  MEDIAN_TIME_BLOCKS):
+            by_height[summary['header']['index']] = summary['header']
+            summary = self.blocks.get(summary['header']['previous_hash'])
+
+        def header_at(height: int) -> Tuple[float, int]:
+            return by_height[height]['timestamp'], by_height[height]['difficulty']
+
+        return ([rules.difficulty_for(block['index'], header_at) for block in blocks],
+                [rules.median_time_past(block['index'], header_at) for block in blocks])
+
+    def _verify(self, node_url: str, blocks: List[Dict]) -> Optional[str]:
+        """Verify new blocks and record the valid prefix; returns the hash of the last block accepted"""
+        parent = self.blocks.get(blocks[0]['previous_hash'])
+        if parent is None:
+            self.rejected[blocks[0]['hash']] = ["Unknown parent"]
+            self.cursors[node_url]['rejected'] = blocks[0]['hash']
+            self._alert("tampering", node_url, f"Block {blocks[0]['index']} does not build on any verified block",
+                        height=blocks[0]['index'])
+            return None
+        difficulties, min_timestamps = self._expected_rules(blocks[0]['previous_hash'], blocks)
+        result = self.engine.verify_blocks(blocks, {**parent['header'], "votes": []}, difficulties, min_timestamps)
+        first_invalid = min(result['invalid_heights'], default=None)
+        accepted = None
+        for block in blocks:
+            if block['index'] == first_invalid:
+                errors = [error for error in result['errors'] if error.endswith(f" at block {first_invalid}")]
+                self.rejected[block['hash']] = errors
+                self.cursors[node_url]['rejected'] = block['hash']
+                self._alert("tampering", node_url, f"Block {first_invalid} failed verification: {'; '.join(errors)}",
+                            height=first_invalid, block_hash=block['hash'])
+                break
+            header = {field: block[field] for field in
+                      ("index", "merkle_root", "timestamp", "previous_hash", "difficulty", "nonce", "hash")}
+            self.blocks[block['hash']] = {
+                "header": header,
+                "work": self.blocks[block['previous_hash']]['work'] + block_work(block['difficulty']),
+                "votes": [(vote.get("voter_id"), vote.get("candidate")) for vote in block['votes']]
+            }
+            accepted = block['hash']
+        return accepted
+
+    def _advance(self, node_url: str, tip: Dict, headers: List[Dict]):
+        """Verify what a node added since its cursor and move the cursor to its last valid block"""
+        cursor = self.cursors[node_url]
+        cursor['reachable'] = True
+        if not headers:
+            return
+        self._check_fork(node_url, headers)
+
+        # Blocks another node already delivered are not downloaded or verified again; since
+        # nothing is verified on top of an unverified parent, the unknown blocks form a suffix
+        new = [header for header in headers if header['hash'] not in self.blocks]
+        last = new[0]['previous_hash'] if new else headers[-1]['hash']
+        if new and new[0]['hash'] in self.rejected:
+            if cursor['rejected'] != new[0]['hash']:
+                cursor['rejected'] = new[0]['hash']
+                self._alert("tampering", node_url, f"Serves rejected block {new[0]['index']}: "
+                            f"{'; '.join(self.rejected[new[0]['hash']])}", height=new[0]['index'], block_hash=new[0]['hash'])
+        elif new:
+            for start in range(0, len(new), self.batch_size):
+                batch = new[start:start + self.batch_size]
+                bodies = self.peer_client.get_blocks(node_url, "/blocks",
+                                                     {"from": batch[0]['index'], "to": batch[-1]['index'] + 1}, timeout=10)
+                accepted = self._verify(node_url, bodies) if bodies else None
+                if accepted is None:
+                    break
+                last = accepted
+                if accepted != bodies[-1]['hash']:
+                    break
+
+        summary = self.blocks.get(last)
+        if summary is not None and last != cursor['hash']:
+            cursor['height'], cursor['hash'] = summary['header']['index'], last
+            cursor['progress_at'] = time.time()
+            cursor['stalled'] = False
+            if summary['work'] > self.blocks[self.chain[-1]]['work']:
+                self._adopt(node_url, last)
+
+    def _adopt(self, node_url: str, tip_hash: str):
+        """Make the verified chain ending in `tip_hash` the one the tally and voter index follow"""
+        path = []
+        block_hash = tip_hash
+        while True:
+            summary = self.blocks[block_hash]
+            height = summary['header']['index']
+            if height < len(self.chain) and self.chain[height] == block_hash:
+                break
+            path.append(summary)
+            block_hash = summary['header']['previous_hash']
+
+        fork_height = height + 1
+        for height in range(len(self.chain) - 1, fork_height - 1, -1):
+            for voter_id, candidate in self.blocks[self.chain[height]]['votes']:
+                if self.voter_index.get(voter_id) == height:
+                    del self.voter_index[voter_id]
+                    self.tally[candidate] -= 1
+                    if not self.tally[candidate]:
+                        del self.tally[candidate]
+        del self.chain[fork_height:]
+
+        for summary in reversed(path):
+            height = summary['header']['index']
+            self.chain.append(summary['header']['hash'])
+            for voter_id, candidate in summary['votes']:
+                if voter_id in self.voter_index:
+                    self._alert("double_vote", node_url,
+                                f"{voter_id} voted at heights {self.voter_index[voter_id]} and {height}",
+                                voter_id=voter_id, height=height)
+                    continue
+                self.voter_index[voter_id] = height
+                self.tally[candidate] = self.tally.get(candidate, 0) + 1
+
+    def _check_nodes(self):
+        """Stall and divergence checks against the most-work verified chain"""
+        now = time.time()
+        tip_height = len(self.chain) - 1
+        for node_url, cursor in self.cursors.items():
+            # Blocks are only produced when votes arrive, so an idle node is not stalled: the
+            # timeout runs from when it fell behind (or from its last advance since then)
+            if cursor['reachable'] and cursor['height'] >= tip_height:
+                cursor['behind_since'] = None
+                cursor['stalled'] = False
+            elif cursor['behind_since'] is None:
+                cursor['behind_since'] = now
+            elif not cursor['stalled']:
+                waited = now - max(cursor['behind_since'], cursor['progress_at'])
+                if waited >= self.stall_timeout:
+                    cursor['stalled'] = True
+                    reason = ("unreachable" if not cursor['reachable']
+                              else f"stuck at height {cursor['height']} of {tip_height}")
+                    self._alert("stalled", node_url, f"No progress for {waited:.0f}s, {reason}",
+                                height=cursor['height'])
+
+            on_chain = cursor['height'] <= tip_height and self.chain[cursor['height']] == cursor['hash']
+            if on_chain:
+                cursor['diverged_since'] = None
+                cursor['divergence_reported'] = False
+            elif cursor['diverged_since'] is None:
+                cursor['diverged_since'] = now
+            elif not cursor['divergence_reported'] and now - cursor['diverged_since'] >= self.divergence_timeout:
+                # Short-lived forks are normal under proof of work; only persistent ones are reported
+                cursor['divergence_reported'] = True
+                self._alert("divergence", node_url,
+                            f"Off the most-work chain for {now - cursor['diverged_since']:.0f}s at height {cursor['height']}",
+                            height=cursor['height'], block_hash=cursor['hash'])
+
+    def poll(self) -> List[Dict]:
+        """One audit round over every node; returns the alerts it raised"""
+        with self._lock:
+            self._round_alerts = []
+            fetched = self.peer_client.fan_out(self.node_urls, self._fetch_new_headers)
+            for node_url in self.node_urls:
+                if node_url not in fetched:
+                    self.cursors[node_url]['reachable'] = False
+                    continue
+                try:
+                    self._advance(node_url, *fetched[node_url])
+                except Exception as e:
+                    print(f"[auditor] Audit of {node_url} failed: {e}")
+                    self.cursors[node_url]['reachable'] = False
+            self._check_nodes()
+            return self._round_alerts
+
+    def run(self):
+        """Poll every `interval` seconds until stop() is called"""
+        while not self._stop.is_set():
+            started = time.time()
+            self.poll()
+            self._stop.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def stop(self):
+        self._stop.set()
+        self.engine.close()
+
+    def status(self) -> Dict:
+        """Verified chain, running tally and per-node cursors"""
+        with self._lock:
+            return {
+                "height": len(self.chain) - 1,
+                "tip": self.chain[-1],
+                "tally": dict(self.tally),
+                "unique_voters": len(self.voter_index),
+                "nodes": {node_url: {
+                    "height": cursor['height'],
+                    "hash": cursor['hash'],
+                    "reachable": cursor['reachable'],
+                    "stalled": cursor['stalled'],
+                    "diverged": cursor['diverged_since'] is not None
+                } for node_url, cursor in self.cursors.items()},
+                "alerts": len(self.alerts)
+            }
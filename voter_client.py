@@ -1,7 +1,9 @@
 import requests
 import time
-from typing import Dict
+from typing import Dict, Iterator, List, Tuple
+from block import Block
 from crypto_utils import CryptoUtils
+from wire_format import BLOCKS_ACCEPT, STREAM_ACCEPT, iter_blocks, read_blocks
 
 class VoterClient:
     """Client for voters to submit votes (Producer)"""
@@ -31,6 +33,42 @@ class VoterClient:
                 "message": f"Failed to submit vote: {str(e)}"
             }
     
+    def cast_votes(self, ballots: List[Tuple[str, str]], batch_size: int = 500) -> Dict:
+        """Cast many (voter_id, candidate) ballots through the batch endpoint
+        
+        Returns the accepted/rejected totals and one result per ballot, in order.
+        """
+        results = []
+        for start in range(0, len(ballots), batch_size):
+            votes = []
+            for voter_id, candidate in ballots[start:start + batch_size]:
+                vote_data = {
+                    "voter_id": CryptoUtils.hash_voter_id(voter_id),
+                    "candidate": candidate,
+                    "timestamp": time.time()
+                }
+                vote_data["signature"] = CryptoUtils.sign_vote(vote_data)
+                votes.append(vote_data)
+            
+            try:
+                response = requests.post(f"{self.node_url}/votes/batch", json={"votes": votes}, timeout=30)
+                data = response.json()
+                results.extend(data["results"] if "results" in data
+                               else [{"success": False, "message": data.get("message")}] * len(votes))
+            except Exception as e:
+                results.extend([{
+                    "success": False,
+                    "message": f"Failed to submit vote: {str(e)}"
+                }] * len(votes))
+        
+        accepted = sum(1 for result in results if result["success"])
+        return {
+            "success": accepted == len(results),
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "results": results
+        }
+    
     def get_results(self) -> Dict:
         """Get current voting results"""
         try:
@@ -41,19 +79,46 @@ class VoterClient:
                 "error": f"Failed to get results: {str(e)}"
             }
     
+    def get_chain(self, start: int = 0) -> List[Dict]:
+        """Download blocks from `start` to the tip (compact binary format when the node supports it)"""
+        response = requests.get(f"{self.node_url}/blocks", params={"from": start},
+                                headers={"Accept": BLOCKS_ACCEPT}, timeout=10)
+        response.raise_for_status()
+        return read_blocks(response)
+    
+    def iter_chain(self, start: int = 0) -> Iterator[Dict]:
+        """Stream blocks from `start` to the tip one at a time, in constant memory"""
+        with requests.get(f"{self.node_url}/blocks", params={"from": start},
+                          headers={"Accept": STREAM_ACCEPT}, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            yield from iter_blocks(response)
+    
+    def get_vote_status(self, voter_id: str) -> Dict:
+        """Look up a voter's vote status (pending/confirmed) in the node's voter index"""
+        try:
+            hashed_voter_id = CryptoUtils.hash_voter_id(voter_id)
+            response = requests.get(f"{self.node_url}/voter/{hashed_voter_id}", timeout=5)
+            return response.json()
+        except Exception as e:
+            return {
+                "found": False,
+                "error": f"Failed to look up vote: {str(e)}"
+            }
+    
+    def has_voted(self, voter_id: str) -> bool:
+        """Check whether a voter has a pending or confirmed vote"""
+        return self.get_vote_status(voter_id).get("found", False)
+    
     def verify_vote_recorded(self, voter_id: str) -> bool:
-        """Verify that vote was recorded in blockchain"""
+        """Verify that vote was recorded in blockchain using a Merkle inclusion proof"""
         try:
-            response = requests.get(f"{self.node_url}/chain", timeout=5)
-            chain_data = response.json()
-            
             hashed_voter_id = CryptoUtils.hash_voter_id(voter_id)
+            response = requests.get(f"{self.node_url}/proof/{hashed_voter_id}", timeout=5)
+            if response.status_code != 200:
+                return False
+            proof_data = response.json()
             
-            for block in chain_data['chain']:
-                for vote in block.get('votes', []):
-                    if vote.get('voter_id') == hashed_voter_id:
-                        return True
-            return False
+            return (proof_data['vote'].get('voter_id') == hashed_voter_id
+                    and Block.verify_inclusion(proof_data))
         except:
             return False
-
@@ -8,6 +8,7 @@ import secrets
 from functools import wraps
 from datetime import datetime, timedelta
 import os
+from block import Block
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
@@ -116,19 +117,25 @@ def sign_vote(vote_data):
     return hashlib.sha256(vote_string.encode()).hexdigest()
 
 def check_if_voted(email):
-    """Check if user has already voted by querying blockchain"""
+    """Check if user has already voted (pending or confirmed) via the node's voter index"""
     try:
-        response = requests.get(f"{BLOCKCHAIN_NODE_URL}/chain", timeout=5)
-        chain_data = response.json()
-        
         hashed_email = hash_voter_id(email)
-        
-        # Check all blocks for this voter ID
-        for block in chain_data['chain']:
-            for vote in block.get('votes', []):
-                if vote.get('voter_id') == hashed_email:
-                    return True
+        response = requests.get(f"{BLOCKCHAIN_NODE_URL}/voter/{hashed_email}", timeout=5)
+        return response.status_code == 200 and response.json().get('found', False)
+    except:
         return False
+
+def verify_vote_proof(email):
+    """Check the node's Merkle inclusion proof that the user's vote is in a block"""
+    try:
+        hashed_email = hash_voter_id(email)
+        response = requests.get(f"{BLOCKCHAIN_NODE_URL}/proof/{hashed_email}", timeout=5)
+        if response.status_code != 200:
+            return False
+        proof_data = response.json()
+        
+        return (proof_data['vote'].get('voter_id') == hashed_email
+                and Block.verify_inclusion(proof_data))
     except:
         return False
 
@@ -367,7 +374,7 @@ def results():
 def verify():
     """Verify vote was recorded"""
     user_email = session.get('user_email')
-    has_voted = check_if_voted(user_email)
+    has_voted = verify_vote_proof(user_email)
     
     return render_template('verify.html', has_voted=has_voted)
 
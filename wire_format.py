@@ -0,0 +1,249 @@
+import gzip
+import json
+import re
+import struct
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Compact binary block encoding
+#
+#   stream  := MAGIC varint(block count) block*
+#   block   := 0x00 compact-block | 0x01 varint(len) json
+#   compact := varint(index) number(timestamp) digest(previous_hash)
+#              digest(merkle_root) varint(difficulty) varint(nonce) digest(hash)
+#              varint(#candidates) string* varint(#votes) vote*
+#   vote    := 0x00 digest(voter_id) varint(candidate slot) number(timestamp) digest(signature)
+#            | 0x01 varint(len) json
+#   digest  := 0x00 32 raw bytes | 0x01 string      (hex digests shrink to half size)
+#   number  := 'f' float64 | 'i' zigzag varint      (kept exact so signatures still verify)
+#
+# Anything that does not fit the compact layout falls back to embedded JSON.
+
+MAGIC = b"VB\x02"
+BINARY_MIMETYPE = "application/x-voting-blocks"
+# Accept header for clients that prefer binary but take JSON from older nodes
+BLOCKS_ACCEPT = f"{BINARY_MIMETYPE}, application/json;q=0.5"
+
+# Newline-delimited JSON, one block per line, for responses read a block at a time
+NDJSON_MIMETYPE = "application/x-ndjson"
+STREAM_ACCEPT = f"{NDJSON_MIMETYPE}, application/json;q=0.5"
+
+BLOCK_FIELDS = {"index", "votes", "timestamp", "previous_hash", "merkle_root", "difficulty", "nonce", "hash"}
+VOTE_FIELDS = {"voter_id", "candidate", "timestamp", "signature"}
+HEX_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+FLOAT64 = struct.Struct(">d")
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _write_bytes(out: bytearray, raw: bytes):
+    _write_varint(out, len(raw))
+    out += raw
+
+def _read_bytes(data: bytes, pos: int) -> Tuple[bytes, int]:
+    length, pos = _read_varint(data, pos)
+    return data[pos:pos + length], pos + length
+
+def _write_digest(out: bytearray, value: str):
+    if HEX_DIGEST.match(value):
+        out.append(0)
+        out += bytes.fromhex(value)
+    else:
+        out.append(1)
+        _write_bytes(out, value.encode())
+
+def _read_digest(data: bytes, pos: int) -> Tuple[str, int]:
+    if data[pos] == 0:
+        return data[pos + 1:pos + 33].hex(), pos + 33
+    raw, pos = _read_bytes(data, pos + 1)
+    return raw.decode(), pos
+
+def _is_number(value) -> bool:
+    return type(value) in (int, float)
+
+def _write_number(out: bytearray, value):
+    if type(value) is float:
+        out += b"f"
+        out += FLOAT64.pack(value)
+    else:
+        out += b"i"
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+def _read_number(data: bytes, pos: int):
+    if data[pos:pos + 1] == b"f":
+        return FLOAT64.unpack_from(data, pos + 1)[0], pos + 9
+    zigzag, pos = _read_varint(data, pos + 1)
+    return (zigzag >> 1) if not zigzag & 1 else -((zigzag + 1) >> 1), pos
+
+def _is_digest(value) -> bool:
+    return isinstance(value, str)
+
+def _vote_is_compact(vote: Dict) -> bool:
+    return (set(vote) == VOTE_FIELDS and _is_digest(vote["voter_id"]) and _is_digest(vote["signature"])
+            and isinstance(vote["candidate"], str) and _is_number(vote["timestamp"]))
+
+def _block_is_compact(block: Dict) -> bool:
+    return (set(block) == BLOCK_FIELDS and isinstance(block["votes"], list)
+            and type(block["index"]) is int and block["index"] >= 0
+            and type(block["nonce"]) is int and block["nonce"] >= 0 and _is_number(block["timestamp"])
+            and type(block["difficulty"]) is int and block["difficulty"] >= 0
+            and all(_is_digest(block[field]) for field in ("previous_hash", "merkle_root", "hash")))
+
+def _write_json(out: bytearray, value):
+    out.append(1)
+    _write_bytes(out, json.dumps(value, separators=(",", ":")).encode())
+
+def encode_blocks(blocks: List[Dict]) -> bytes:
+    """Encode block dicts into the compact binary format"""
+    out = bytearray(MAGIC)
+    _write_varint(out, len(blocks))
+    for block in blocks:
+        if not _block_is_compact(block):
+            _write_json(out, block)
+            continue
+        out.append(0)
+        _write_varint(out, block["index"])
+        _write_number(out, block["timestamp"])
+        _write_digest(out, block["previous_hash"])
+        _write_digest(out, block["merkle_root"])
+        _write_varint(out, block["difficulty"])
+        _write_varint(out, block["nonce"])
+        _write_digest(out, block["hash"])
+
+        # Intern candidate names into a per-block table
+        slots: Dict[str, int] = {}
+        for vote in block["votes"]:
+            if isinstance(vote, dict) and _vote_is_compact(vote):
+                slots.setdefault(vote["candidate"], len(slots))
+        _write_varint(out, len(slots))
+        for candidate in slots:
+            _write_bytes(out, candidate.encode())
+
+        _write_varint(out, len(block["votes"]))
+        for vote in block["votes"]:
+            if not (isinstance(vote, dict) and _vote_is_compact(vote)):
+                _write_json(out, vote)
+                continue
+            out.append(0)
+            _write_digest(out, vote["voter_id"])
+            _write_varint(out, slots[vote["candidate"]])
+            _write_number(out, vote["timestamp"])
+            _write_digest(out, vote["signature"])
+    return bytes(out)
+
+def decode_blocks(data: bytes) -> List[Dict]:
+    """Decode the compact binary format back into block dicts"""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a binary block stream")
+    count, pos = _read_varint(data, len(MAGIC))
+    blocks = []
+    for _ in range(count):
+        if data[pos] == 1:
+            raw, pos = _read_bytes(data, pos + 1)
+            blocks.append(json.loads(raw))
+            continue
+        index, pos = _read_varint(data, pos + 1)
+        timestamp, pos = _read_number(data, pos)
+        previous_hash, pos = _read_digest(data, pos)
+        merkle_root, pos = _read_digest(data, pos)
+        difficulty, pos = _read_varint(data, pos)
+        nonce, pos = _read_varint(data, pos)
+        block_hash, pos = _read_digest(data, pos)
+
+        candidate_count, pos = _read_varint(data, pos)
+        candidates = []
+        for _ in range(candidate_count):
+            raw, pos = _read_bytes(data, pos)
+            candidates.append(raw.decode())
+
+        vote_count, pos = _read_varint(data, pos)
+        votes = []
+        for _ in range(vote_count):
+            if data[pos] == 1:
+                raw, pos = _read_bytes(data, pos + 1)
+                votes.append(json.loads(raw))
+                continue
+            voter_id, pos = _read_digest(data, pos + 1)
+            slot, pos = _read_varint(data, pos)
+            vote_timestamp, pos = _read_number(data, pos)
+            signature, pos = _read_digest(data, pos)
+            votes.append({
+                "voter_id": voter_id,
+                "candidate": candidates[slot],
+                "timestamp": vote_timestamp,
+                "signature": signature
+            })
+
+        blocks.append({
+            "index": index,
+            "votes": votes,
+            "timestamp": timestamp,
+            "previous_hash": previous_hash,
+            "merkle_root": merkle_root,
+            "difficulty": difficulty,
+            "nonce": nonce,
+            "hash": block_hash
+        })
+    return blocks
+
+def accepts_binary(accept_header: str) -> bool:
+    """Whether an Accept header asks for the binary block format"""
+    return BINARY_MIMETYPE in (accept_header or "")
+
+def accepts_ndjson(accept_header: str) -> bool:
+    return NDJSON_MIMETYPE in (accept_header or "")
+
+def encode_ndjson(blocks: Iterable[Dict]) -> Iterator[bytes]:
+    """One JSON line per block, produced lazily so a response never holds the whole chain"""
+    for block in blocks:
+        yield json.dumps(block).encode() + b"\n"
+
+def choose_encoding(accept_encoding_header: str) -> Optional[str]:
+    """Pick gzip or deflate from an Accept-Encoding header, if offered"""
+    offered = {part.split(";")[0].strip() for part in (accept_encoding_header or "").split(",")}
+    for encoding in ("gzip", "deflate"):
+        if encoding in offered:
+            return encoding
+    return None
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Apply a Content-Encoding"""
+    return gzip.compress(data) if encoding == "gzip" else zlib.compress(data)
+
+def read_blocks(response) -> List[Dict]:
+    """Blocks from a /chain or /blocks response in either format
+
+    `requests` already undoes gzip/deflate Content-Encoding, so only the
+    media type has to be checked here.
+    """
+    if response.headers.get("Content-Type", "").startswith(BINARY_MIMETYPE):
+        return decode_blocks(response.content)
+    data = response.json()
+    return data["blocks"] if "blocks" in data else data["chain"]
+
+def iter_blocks(response, chunk_size: int = 65536) -> Iterator[Dict]:
+    """Blocks from a /chain or /blocks response, one at a time
+
+    Newline-delimited responses are parsed line by line as they arrive
+    (request them with stream=True to keep memory bounded); the other
+    formats have to be decoded whole.
+    """
+    if response.headers.get("Content-Type", "").startswith(NDJSON_MIMETYPE):
+        for line in response.iter_lines(chunk_size=chunk_size):
+            if line:
+                yield json.loads(line)
+    else:
+        yield from read_blocks(response)